@@ -0,0 +1,22 @@
+from rest_framework.authentication import TokenAuthentication
+
+from users.tokens import cache_token, get_cached
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с общим для всех процессов кэшем
+    токен -> пользователь.
+
+    Записи живут не дольше AUTH_TOKEN_CACHE_TIMEOUT секунд. Запись токена
+    сбрасывается при его удалении (выход) и при сохранении или удалении
+    пользователя (смена пароля, блокировка). Неверные токены и неактивные
+    пользователи не кэшируются.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = get_cached(key)
+        if entry is not None:
+            return entry
+        user, token = super().authenticate_credentials(key)
+        cache_token(key, user, token)
+        return user, token
@@ -0,0 +1,136 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from threading import Lock
+
+from recipes.models import AmountIngredientRecipe, RecipeIngredientsChange
+from recipes.versions import get_version
+
+
+def without(posting, recipe_id):
+    """Копия массива id рецептов без recipe_id."""
+    index = bisect_left(posting, recipe_id)
+    if index < len(posting) and posting[index] == recipe_id:
+        return posting[:index] + posting[index + 1:]
+    return posting
+
+
+def with_recipe(posting, recipe_id):
+    """Копия массива id рецептов с recipe_id на своем месте."""
+    index = bisect_left(posting, recipe_id)
+    if index < len(posting) and posting[index] == recipe_id:
+        return posting
+    return posting[:index] + array('q', (recipe_id,)) + posting[index:]
+
+
+class RecipeIngredientIndex:
+    """Обратный индекс ингредиент -> рецепты в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта - id его ингредиентов. Индекс строится при первом
+    обращении, а затем дочитывает журнал RecipeIngredientsChange и
+    обновляет только изменившиеся рецепты. Массивы не меняются на месте,
+    а заменяются копиями, поэтому поиск идет без блокировки.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._postings = {}
+        self._recipes = {}
+
+    def _build(self):
+        version = get_version('recipe_ingredients')
+        postings = {}
+        recipes = defaultdict(list)
+        rows = AmountIngredientRecipe.objects.order_by(
+            'ingredient_id', 'recipe_id'
+        ).values_list('ingredient_id', 'recipe_id').iterator()
+        for ingredient_id, recipe_id in rows:
+            posting = postings.get(ingredient_id)
+            if posting is None:
+                posting = postings[ingredient_id] = array('q')
+            posting.append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+        self._postings = postings
+        self._recipes = {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in recipes.items()
+        }
+        self._version = version
+
+    def _changes(self):
+        return list(RecipeIngredientsChange.objects.filter(
+            version__gt=self._version
+        ).values_list('version', 'recipe_id'))
+
+    def _update(self, recipe_ids):
+        current = defaultdict(list)
+        for recipe_id, ingredient_id in AmountIngredientRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            current[recipe_id].append(ingredient_id)
+        for recipe_id in recipe_ids:
+            old = set(self._recipes.get(recipe_id, ()))
+            new = set(current.get(recipe_id, ()))
+            for ingredient_id in old - new:
+                self._postings[ingredient_id] = without(
+                    self._postings[ingredient_id], recipe_id)
+            for ingredient_id in new - old:
+                self._postings[ingredient_id] = with_recipe(
+                    self._postings.get(ingredient_id, array('q')),
+                    recipe_id)
+            if new:
+                self._recipes[recipe_id] = tuple(new)
+            else:
+                self._recipes.pop(recipe_id, None)
+
+    def _actual(self):
+        if self._version is not None and not self._changes():
+            return
+        with self._lock:
+            if self._version is None:
+                self._build()
+                return
+            changes = self._changes()
+            if not changes:
+                return
+            recipe_ids = {recipe_id for _, recipe_id in changes}
+            if (changes[0][0] != self._version + 1
+                    or None in recipe_ids):
+                # Журнал уже обрезан или изменились все рецепты.
+                self._build()
+                return
+            self._update(recipe_ids)
+            self._version = changes[-1][0]
+
+    def top(self, ingredient_ids, limit):
+        """Рецепты, лучше всего покрытые ингредиентами ingredient_ids.
+
+        Возвращает список (recipe_id, matched, missing), отсортированный
+        по доле покрытия, затем по числу недостающих ингредиентов и по
+        убыванию id рецепта.
+        """
+        self._actual()
+        postings, recipes = self._postings, self._recipes
+        matched = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matched.update(postings.get(ingredient_id, ()))
+        candidates = (
+            (recipe_id, count, len(recipes.get(recipe_id, ())))
+            for recipe_id, count in matched.items()
+        )
+        best = heapq.nsmallest(
+            limit,
+            (item for item in candidates if item[2]),
+            key=lambda item: (-item[1] / item[2], item[2] - item[1],
+                              -item[0]),
+        )
+        return [
+            (recipe_id, count, size - count)
+            for recipe_id, count, size in best
+        ]
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
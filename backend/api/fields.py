@@ -0,0 +1,76 @@
+import base64
+import binascii
+
+from django.core.files.storage import default_storage
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.fields import ReadOnlyField
+
+from recipes.images import variant_names
+
+
+class RecipeImageField(Base64ImageField):
+    """Изображение в base64.
+
+    Если при изменении рецепта пришло то же изображение, что уже
+    сохранено, возвращается сохраненный файл без повторной обработки.
+    """
+
+    def to_internal_value(self, base64_data):
+        stored = getattr(
+            getattr(self.parent, 'instance', None), self.source, None
+        )
+        if stored and self.is_stored_file(stored, base64_data):
+            return stored
+        return super().to_internal_value(base64_data)
+
+    @staticmethod
+    def is_stored_file(stored, base64_data):
+        if not isinstance(base64_data, str):
+            return False
+        payload = base64_data.split(';base64,')[-1]
+        padding = len(payload) - len(payload.rstrip('='))
+        try:
+            if len(payload) * 3 // 4 - padding != stored.size:
+                return False
+            decoded_file = base64.b64decode(payload)
+            with stored.open('rb') as file:
+                return file.read() == decoded_file
+        except (OSError, ValueError, binascii.Error):
+            return False
+
+
+def file_url(name, request=None):
+    """Ссылка на файл хранилища, абсолютная при наличии запроса."""
+    url = default_storage.url(name)
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return url
+
+
+def variant_urls(name, variants_image, request=None):
+    """Ссылки на варианты изображения name.
+
+    Варианты создаются в фоне после сохранения рецепта; пока фоновая
+    задача не записала в variants_image имя изображения, ссылок нет.
+    Хранилище при чтении не опрашивается.
+    """
+    if not name or name != variants_image:
+        return {}
+    return {
+        variant: file_url(path, request)
+        for variant, path in variant_names(name).items()
+    }
+
+
+class ImageVariantsField(ReadOnlyField):
+    """Ссылки на уменьшенные копии и WebP-версии изображения рецепта."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return variant_urls(
+            recipe.image.name, recipe.variants_image,
+            self.context.get('request'),
+        )
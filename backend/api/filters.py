@@ -1,5 +1,9 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
 from django_filters.rest_framework import FilterSet, filters
 
+from recipes.memberships import favorites, shopping_cart
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -25,20 +29,49 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart', 'search'
+        )
 
-    def get_filter(self, queryset, value, filter_parameters):
+    def get_filter(self, queryset, value, membership):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(**filter_parameters)
+            return queryset.filter(
+                id__in=membership.recipe_ids(self.request.user))
         return queryset
 
     def filter_is_favorited(self, queryset, name, value):
-        filter_parameters = {'favorites__user': self.request.user}
-        return self.get_filter(queryset, value, filter_parameters)
+        return self.get_filter(queryset, value, favorites)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        filter_parameters = {'shopping_cart__user': self.request.user}
-        return self.get_filter(queryset, value, filter_parameters)
+        return self.get_filter(queryset, value, shopping_cart)
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию рецепта.
+
+        На PostgreSQL используется поисковый вектор с GIN-индексом,
+        на остальных базах - поиск подстроки. SQLite сравнивает без
+        учета регистра только латиницу, поэтому там кириллица ищется
+        с учетом регистра.
+        """
+        if not value.strip():
+            return queryset
+        if connections[queryset.db].vendor == 'postgresql':
+            query = SearchQuery(
+                value, config='russian', search_type='websearch'
+            )
+            return queryset.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            ).order_by('-rank', '-pub_date')
+        return queryset.filter(
+            Q(name__icontains=value) | Q(text__icontains=value)
+        ).annotate(
+            rank=Case(
+                When(name__icontains=value, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('-rank', '-pub_date')
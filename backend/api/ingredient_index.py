@@ -0,0 +1,59 @@
+from bisect import bisect_left
+from threading import Lock
+
+from recipes.models import Ingredient
+from recipes.versions import get_version
+
+
+def fold(value):
+    """Приводит строку к виду для поиска без учета регистра и буквы ё."""
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientPrefixIndex:
+    """Отсортированный индекс названий ингредиентов в памяти процесса.
+
+    Строится при первом обращении и перестраивается, когда меняется
+    версия данных ингредиентов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._data = ([], [])
+
+    def _build(self):
+        entries = sorted(
+            (fold(name), name, pk, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            ).iterator()
+        )
+        keys = [entry[0] for entry in entries]
+        rows = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, name, pk, measurement_unit in entries
+        ]
+        return keys, rows
+
+    def _actual(self):
+        version = get_version('ingredients')
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._data = self._build()
+                    self._version = version
+        return self._data
+
+    def search(self, prefix, limit=None):
+        """Ингредиенты, название которых начинается с prefix."""
+        keys, rows = self._actual()
+        prefix = fold(prefix)
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\U0010ffff', start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return rows[start:end]
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,113 @@
+import json
+import logging
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Списки параметров IN (%s, %s, ...) разной длины - одна и та же форма.
+PARAMS_LIST = re.compile(r'\((?:%s, )+%s\)')
+PROJECT_DIR = str(settings.BASE_DIR)
+
+
+def query_shape(sql):
+    return PARAMS_LIST.sub('(%s...)', sql)
+
+
+def caller():
+    """Ближайшая к запросу функция кода проекта: файл, строка, имя."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(PROJECT_DIR) and filename != __file__
+                and 'site-packages' not in filename):
+            return (f'{filename[len(PROJECT_DIR) + 1:]}:{frame.f_lineno} '
+                    f'{frame.f_code.co_name}')
+        frame = frame.f_back
+    return None
+
+
+class QueryStats:
+    """Счетчики SQL одного запроса к приложению."""
+
+    def __init__(self, repeats):
+        self.repeats = repeats
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.repeated = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+            if self.repeats:
+                shape = query_shape(sql)
+                self.shapes[shape] += 1
+                if self.shapes[shape] == self.repeats:
+                    self.repeated[shape] = caller()
+
+
+class QueryTimingMiddleware:
+    """Количество и время SQL-запросов, время Python и имя view.
+
+    Данные отдаются заголовком Server-Timing и строкой JSON в лог
+    api.middleware. При QUERY_TIMING_REPEATS > 0 одинаковые по форме
+    запросы, повторившиеся столько раз, попадают в лог вместе с
+    функцией проекта, которая их выполнила (N+1). Без
+    QUERY_TIMING_ENABLED middleware не подключается.
+
+    Запросы потоковых ответов выполняются после выхода из middleware
+    и не учитываются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats(settings.QUERY_TIMING_REPEATS)
+        started = perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total = perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        response['Server-Timing'] = (
+            f'db;dur={stats.duration * 1000:.1f};'
+            f'desc="{stats.count} queries", '
+            f'app;dur={(total - stats.duration) * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(stats.duration * 1000, 1),
+            'python_ms': round((total - stats.duration) * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+        }, ensure_ascii=False))
+        for shape, source in stats.repeated.items():
+            logger.warning(json.dumps({
+                'n_plus_one': view,
+                'path': request.path,
+                'count': stats.shapes[shape],
+                'source': source,
+                'sql': shape,
+            }, ensure_ascii=False))
+        return response
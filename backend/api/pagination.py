@@ -1,6 +1,171 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes.paginator import CachedCountPaginator
+
+
+class KeysetPagination(BasePagination):
+    """Постраничный вывод по ключу сортировки без COUNT(*) и OFFSET.
+
+    Курсор хранит значения полей сортировки последнего (или первого)
+    объекта страницы, следующая страница выбирается условием
+    (pub_date, id) < (последний pub_date, последний id).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self.invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, ordering))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(position, ordering):
+        """Условие "строго после position" для заданной сортировки."""
+        condition = Q()
+        for index, field in enumerate(ordering):
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(ordering[:index], position)
+            }
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal[f'{field.lstrip("-")}__{lookup}'] = position[index]
+            condition |= Q(**equal)
+        return condition
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            value = (instance[name] if isinstance(instance, dict)
+                     else getattr(instance, name))
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    def encode_cursor(self, position, reverse):
+        encoded = urlsafe_b64encode(
+            json.dumps([position, reverse]).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        """Позиция и направление из курсора.
+
+        Каждое значение позиции приводится к типу своего поля модели,
+        поэтому подделанный курсор дает 404, а не ошибку запроса.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            position, reverse = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+                len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return self.parse_position(position, model), bool(reverse)
+
+    def parse_position(self, position, model):
+        parsed = []
+        for field, value in zip(self.ordering, position):
+            if value is None or isinstance(value, (list, dict)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                parsed.append(
+                    model._meta.get_field(field.lstrip('-')).to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return parsed
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
 
 
 class MainPagePagination(PageNumberPagination):
-    """Ограниение на количество объектов на странице."""
+    """Ограниение на количество объектов на странице.
+
+    С параметром cursor (можно пустым) выдача переключается на
+    KeysetPagination.
+    """
     page_size_query_param = "limit"
+    django_paginator_class = CachedCountPaginator
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        cursor_param = self.keyset_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from recipes.memberships import favorites, shopping_cart
+from recipes.models import AmountIngredientRecipe, Recipe
+from users.models import Subscription, User
+from .fields import file_url, variant_urls
+
+# Чтение рецептов и подписок без сериализаторов DRF: строки .values()
+# собираются в ответ той же формы, что у RecipeGetSerializer и
+# SubscriptionsGetSerializer (docs/openapi-schema.yml).
+
+RECIPE_FIELDS = (
+    'id', 'name', 'image', 'variants_image', 'text', 'cooking_time',
+    'author_id', 'pub_date',
+)
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+SUBSCRIPTION_FIELDS = USER_FIELDS + ('recipes_count',)
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+SHORT_RECIPE_FIELDS = ('id', 'name', 'image', 'image_variants',
+                       'cooking_time')
+
+
+def mapper(fields):
+    """Функция, собирающая словарь ответа из кортежа значений."""
+    def to_dict(values):
+        return dict(zip(fields, values))
+    return to_dict
+
+
+tag_mapper = mapper(TAG_FIELDS)
+ingredient_mapper = mapper(INGREDIENT_FIELDS)
+author_mapper = mapper(USER_FIELDS + ('is_subscribed',))
+short_recipe_mapper = mapper(SHORT_RECIPE_FIELDS)
+
+
+def image_url(name, request):
+    return file_url(name, request) if name else None
+
+
+def tags_by_recipe(recipe_ids):
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag__name').values_list(
+        'recipe_id', *(f'tag__{field}' for field in TAG_FIELDS)
+    )
+    for recipe_id, *values in rows:
+        tags[recipe_id].append(tag_mapper(values))
+    return tags
+
+
+def ingredients_by_recipe(recipe_ids):
+    ingredients = defaultdict(list)
+    rows = AmountIngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('recipe_id', 'id').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount',
+    )
+    for recipe_id, *values in rows:
+        ingredients[recipe_id].append(ingredient_mapper(values))
+    return ingredients
+
+
+def authors_by_id(author_ids, user):
+    subscribed = set()
+    if user.is_authenticated and author_ids:
+        subscribed = set(Subscription.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list('author_id', flat=True))
+    return {
+        values[1]: author_mapper((*values, values[1] in subscribed))
+        for values in User.objects.filter(
+            id__in=author_ids
+        ).values_list(*USER_FIELDS)
+    }
+
+
+def recipe_data(rows, request):
+    """Рецепты в форме RecipeGetSerializer из строк values(*RECIPE_FIELDS)."""
+    rows = list(rows)
+    recipe_ids = [row['id'] for row in rows]
+    user = request.user
+    tags = tags_by_recipe(recipe_ids)
+    ingredients = ingredients_by_recipe(recipe_ids)
+    authors = authors_by_id(
+        {row['author_id'] for row in rows} - {None}, user)
+    favorited = favorites.recipe_ids(user)
+    in_cart = shopping_cart.recipe_ids(user)
+    return [
+        {
+            'id': row['id'],
+            'tags': tags.get(row['id'], []),
+            'author': authors.get(row['author_id']),
+            'ingredients': ingredients.get(row['id'], []),
+            'is_favorited': row['id'] in favorited,
+            'is_in_shopping_cart': row['id'] in in_cart,
+            'name': row['name'],
+            'image': image_url(row['image'], request),
+            'image_variants': variant_urls(
+                row['image'], row['variants_image'], request),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    ]
+
+
+def subscription_data(rows, recipes_limit=None):
+    """Подписки в форме SubscriptionsGetSerializer из строк
+    values(*SUBSCRIPTION_FIELDS).
+
+    Как и в сериализаторе, ссылки на изображения рецептов относительные.
+    """
+    rows = list(rows)
+    author_ids = [row['id'] for row in rows]
+    recipes = Recipe.objects.filter(author_id__in=author_ids)
+    if recipes_limit is not None:
+        recipes = Recipe.objects.latest_by_authors(author_ids, recipes_limit)
+    by_author = defaultdict(list)
+    recipe_rows = recipes.values_list(
+        'author_id', 'id', 'name', 'image', 'variants_image', 'cooking_time')
+    for (author_id, pk, name, image, variants_image,
+         cooking_time) in recipe_rows:
+        by_author[author_id].append(short_recipe_mapper((
+            pk, name, image_url(image, None),
+            variant_urls(image, variants_image), cooking_time,
+        )))
+    return [
+        {
+            **{field: row[field] for field in USER_FIELDS},
+            'is_subscribed': True,
+            'recipes': by_author.get(row['id'], []),
+            'recipes_count': row['recipes_count'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,80 @@
+import codecs
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson else 0
+)
+
+
+class TextRenderer(BaseRenderer):
+    """Текстовый ответ; данные выгрузок отдаются потоком из представлений,
+    через рендерер проходят только сообщения об ошибках."""
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data).encode(self.charset)
+
+
+class PlainTextRenderer(TextRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(TextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если он установлен.
+
+    Вывод совпадает с JSONRenderer: компактный, без экранирования
+    кириллицы. Даты, Decimal и ленивые строки (verbose_name, сообщения
+    об ошибках) приводятся тем же JSONEncoder, что и в DRF. Без orjson
+    и при запросе отступов (browsable API, Accept: ...; indent=)
+    используется стандартный json.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(
+                accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        content = orjson.dumps(
+            data, default=JSONEncoder().default, option=ORJSON_OPTIONS)
+        # Как и JSONRenderer, экранируем разделители строк для JSONP/JS.
+        return content.replace(
+            LINE_SEPARATOR, b'\\u2028'
+        ).replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson, если он установлен."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,84 @@
+from collections import namedtuple
+from hashlib import md5
+from time import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from recipes.versions import get_versions
+
+RESPONSE_KEY = 'response:{}'
+
+Entry = namedtuple('Entry', ('generation', 'created', 'data'))
+
+
+class AnonymousResponseCache:
+    """Кэш данных ответов для анонимных GET-запросов.
+
+    Ключ - адрес без параметров и отсортированные значения параметров
+    из params, остальные параметры на ответ не влияют. Запись
+    действительна, пока не сменились версии данных version_names и не
+    прошло RESPONSE_CACHE_TIMEOUT секунд. Устаревшую запись пересчитывает
+    один запрос, остальные еще RESPONSE_CACHE_STALE секунд получают
+    старые данные (stale-while-revalidate).
+    """
+
+    def __init__(self, version_names, params):
+        self.version_names = version_names
+        self.params = params
+
+    def key(self, request):
+        params = sorted(
+            (name, sorted(request.query_params.getlist(name)))
+            for name in self.params if name in request.query_params
+        )
+        raw = f'{request.build_absolute_uri(request.path)}{params}'
+        return RESPONSE_KEY.format(md5(raw.encode()).hexdigest())
+
+    def generation(self):
+        return get_versions(*self.version_names)
+
+    @staticmethod
+    def cached_response(entry, state):
+        response = Response(entry.data)
+        response['X-Cache'] = state
+        return response
+
+    def respond(self, request, get_response):
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        if (not timeout or request.method != 'GET'
+                or request.user.is_authenticated):
+            return get_response()
+        stale = settings.RESPONSE_CACHE_STALE
+        key = self.key(request)
+        generation = self.generation()
+        entry = cache.get(key)
+        locked = False
+        if entry is not None:
+            age = time() - entry.created
+            if entry.generation == generation and age < timeout:
+                return self.cached_response(entry, 'HIT')
+            if age < timeout + stale:
+                locked = cache.add(f'{key}:lock', True, stale or 1)
+                if not locked:
+                    return self.cached_response(entry, 'STALE')
+        try:
+            response = get_response()
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    Entry(generation, time(), response.data),
+                    timeout + stale,
+                )
+        finally:
+            if locked:
+                cache.delete(f'{key}:lock')
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+recipe_pages_cache = AnonymousResponseCache(
+    ('recipe_pages', 'authors'),
+    ('page', 'limit', 'cursor', 'tags', 'author', 'search'),
+)
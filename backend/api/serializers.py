@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import Http404
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
@@ -7,7 +8,10 @@ from rest_framework.fields import IntegerField, SerializerMethodField
 from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.serializers import ModelSerializer
 
+from .fields import ImageVariantsField, RecipeImageField
+from recipes.memberships import favorites, shopping_cart
 from recipes.models import AmountIngredientRecipe, Ingredient, Recipe, Tag
+from recipes.versions import log_ingredients_change
 from users.models import Subscription
 
 User = get_user_model()
@@ -30,6 +34,8 @@ class CurrentUserSerializer(ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Отображение - подписан ли пользователь на автора."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (request.user.is_authenticated
                 and Subscription.objects.filter(
@@ -72,6 +78,9 @@ class SubscriptionsGetSerializer(CurrentUserSerializer):
 
     def get_recipes(self, obj):
         """Список рецептов текущего пользователя."""
+        if hasattr(obj, 'shown_recipes'):
+            return RecipeSerializer(
+                obj.shown_recipes, many=True, read_only=True).data
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         recipes = obj.recipes.all()
@@ -81,7 +90,7 @@ class SubscriptionsGetSerializer(CurrentUserSerializer):
 
     def get_recipes_count(self, obj):
         """Количество рецептов у текущего пользователя."""
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class IngredientSerializer(ModelSerializer):
@@ -121,6 +130,7 @@ class RecipeGetSerializer(ModelSerializer):
         source='ingredients_in_recipe'
     )
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     is_favorited = SerializerMethodField()
     is_in_shopping_cart = SerializerMethodField()
 
@@ -135,23 +145,26 @@ class RecipeGetSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
 
+    def get_recipe_ids(self, membership):
+        """Id рецептов пользователя из кэша, один раз на запрос."""
+        name = f'{membership.name}_ids'
+        if name not in self.context:
+            self.context[name] = membership.recipe_ids(
+                self.context.get('request').user)
+        return self.context[name]
+
     def get_is_favorited(self, obj):
         """Отображение добавленых в избранное рецептов."""
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.favorites.filter(recipe=obj).exists()
+        return obj.id in self.get_recipe_ids(favorites)
 
     def get_is_in_shopping_cart(self, obj):
         """Отображение добавленых в корзину рецептов."""
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return user.shopping_cart.filter(recipe=obj).exists()
+        return obj.id in self.get_recipe_ids(shopping_cart)
 
 
 class RecipeIngredientPostSerializer(ModelSerializer):
@@ -183,7 +196,7 @@ class RecipePostSerializer(ModelSerializer):
                                   many=True)
     author = CurrentUserSerializer(read_only=True)
     ingredients = RecipeIngredientPostSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -210,15 +223,20 @@ class RecipePostSerializer(ModelSerializer):
                 {'ingredients':
                     'Рецепт должен сосотоять минимум из 1 ингридиента.'}
             )
-        ingredients_list = []
+        ingredients_by_id = Ingredient.objects.in_bulk(
+            {items['id'] for items in ingredients}
+        )
+        seen_ids = set()
         for items in ingredients:
-            ingredient = get_object_or_404(Ingredient, id=items['id'])
-            if ingredient in ingredients_list:
+            ingredient = ingredients_by_id.get(items['id'])
+            if ingredient is None:
+                raise Http404
+            if ingredient.id in seen_ids:
                 raise ValidationError(
                     {'ingredients':
                         f'Ингредиент {ingredient} уже есть в рецепте.'}
                 )
-            ingredients_list.append(ingredient)
+            seen_ids.add(ingredient.id)
             if int(items['amount']) <= 0:
                 raise ValidationError(
                     {'amount': 'Укажите правильное кол-во ингридиентов.'}
@@ -231,14 +249,22 @@ class RecipePostSerializer(ModelSerializer):
         return cooking_time
 
     @staticmethod
-    def create_ingredients(ingredients, recipe):
-        for ingredient in ingredients:
-            AmountIngredientRecipe.objects.create(
+    def add_ingredients(ingredients, recipe):
+        AmountIngredientRecipe.objects.bulk_create(
+            AmountIngredientRecipe(
                 recipe=recipe,
                 ingredient_id=ingredient.get('id'),
                 amount=ingredient.get('amount'),
             )
+            for ingredient in ingredients
+        )
+
+    @classmethod
+    def create_ingredients(cls, ingredients, recipe):
+        cls.add_ingredients(ingredients, recipe)
+        log_ingredients_change(recipe.id)
 
+    @transaction.atomic
     def create(self, validated_data):
         """Создает рецепт."""
         tags = validated_data.pop('tags')
@@ -248,17 +274,49 @@ class RecipePostSerializer(ModelSerializer):
         self.create_ingredients(recipe=recipe, ingredients=ingredients)
         return recipe
 
+    @classmethod
+    def update_ingredients(cls, ingredients, recipe):
+        """Приводит ингредиенты рецепта к новому списку, затрагивая
+        только изменившиеся строки."""
+        amounts = {
+            ingredient.get('id'): ingredient.get('amount')
+            for ingredient in ingredients
+        }
+        stored = {
+            row.ingredient_id: row
+            for row in AmountIngredientRecipe.objects.filter(recipe=recipe)
+        }
+        removed = stored.keys() - amounts.keys()
+        if removed:
+            AmountIngredientRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, row in stored.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            AmountIngredientRecipe.objects.bulk_update(changed, ('amount',))
+        added = [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in stored
+        ]
+        if added:
+            cls.add_ingredients(added, recipe)
+        if removed or added:
+            log_ingredients_change(recipe.id)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Изменение рецепта."""
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         instance = super().update(instance, validated_data)
-        instance.tags.clear()
         instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients(
-            recipe=instance, ingredients=ingredients)
-        instance.save()
+        self.update_ingredients(ingredients=ingredients, recipe=instance)
         return instance
 
     def to_representation(self, instance):
@@ -270,6 +328,25 @@ class RecipePostSerializer(ModelSerializer):
 
 class RecipeSerializer(ModelSerializer):
     """Превью рецепта."""
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = 'id', 'name', 'image', 'cooking_time'
+        fields = 'id', 'name', 'image', 'image_variants', 'cooking_time'
+
+
+class CookRecipeSerializer(RecipeSerializer):
+    """Превью рецепта с покрытием его ингредиентов."""
+    matched = SerializerMethodField()
+    missing = SerializerMethodField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('matched', 'missing')
+
+    def get_matched(self, obj):
+        """Сколько ингредиентов рецепта есть у пользователя."""
+        return self.context['matches'][obj.id][0]
+
+    def get_missing(self, obj):
+        """Скольких ингредиентов рецепта не хватает."""
+        return self.context['matches'][obj.id][1]
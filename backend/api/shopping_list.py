@@ -0,0 +1,73 @@
+import csv
+import json
+
+from django.db.models import Sum
+
+from recipes.models import AmountIngredientRecipe
+
+CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+def get_ingredients(user):
+    """Суммарное количество ингредиентов из корзины пользователя."""
+    return AmountIngredientRecipe.objects.filter(
+        recipe__shopping_cart__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).order_by('ingredient__name').annotate(
+        amount=Sum('amount')
+    ).iterator()
+
+
+def stream_txt(user):
+    yield f'Список покупок для: {user.get_full_name()}\n\n'
+    separator = ''
+    for ingredient in get_ingredients(user):
+        yield (
+            f'{separator}- {ingredient["ingredient__name"]} '
+            f'({ingredient["ingredient__measurement_unit"]})'
+            f' - {ingredient["amount"]}'
+        )
+        separator = '\n'
+
+
+class Echo:
+    """Псевдобуфер: csv.writer возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(user):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for ingredient in get_ingredients(user):
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['amount'],
+        ))
+
+
+def stream_json(user):
+    yield '['
+    separator = ''
+    for ingredient in get_ingredients(user):
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+            'amount': ingredient['amount'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+STREAMS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
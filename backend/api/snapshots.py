@@ -0,0 +1,93 @@
+import gzip
+import re
+from collections import namedtuple
+from hashlib import md5
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.settings import api_settings
+
+from recipes.models import Ingredient, Tag
+from recipes.versions import get_version
+from .serializers import IngredientSerializer, TagSerializer
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+Snapshot = namedtuple(
+    'Snapshot', ('version', 'created', 'etag', 'content', 'compressed'))
+
+
+class CatalogSnapshot:
+    """Готовый JSON-ответ справочника вместе с его gzip-версией.
+
+    Сериализуется один раз на версию данных и отдается с ETag,
+    на совпадающий If-None-Match отвечает 304. Даже при неизменной версии
+    снимок пересобирается раз в CATALOG_SNAPSHOT_MAX_AGE секунд на случай
+    изменений в обход сигналов (например, правки прямо в базе).
+    """
+
+    def __init__(self, version_name, get_data):
+        self.version_name = version_name
+        self.get_data = get_data
+        self._lock = Lock()
+        self._snapshot = None
+
+    @property
+    def renderer(self):
+        """Первый рендерер из настроек DRF - JSON."""
+        return api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+    def is_actual(self, snapshot, version):
+        return (
+            snapshot is not None and snapshot.version == version
+            and monotonic() - snapshot.created
+            < settings.CATALOG_SNAPSHOT_MAX_AGE
+        )
+
+    def get(self):
+        version = get_version(self.version_name)
+        snapshot = self._snapshot
+        if not self.is_actual(snapshot, version):
+            with self._lock:
+                snapshot = self._snapshot
+                if not self.is_actual(snapshot, version):
+                    content = self.renderer.render(self.get_data())
+                    snapshot = Snapshot(
+                        version,
+                        monotonic(),
+                        f'"{md5(content).hexdigest()}"',
+                        content,
+                        gzip.compress(content),
+                    )
+                    self._snapshot = snapshot
+        return snapshot
+
+    def response(self, request):
+        snapshot = self.get()
+        if snapshot.etag in parse_etags(
+                request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        elif ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            response = HttpResponse(
+                snapshot.compressed, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(
+                snapshot.content, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+tags_snapshot = CatalogSnapshot(
+    'tags',
+    lambda: TagSerializer(Tag.objects.all(), many=True).data,
+)
+ingredients_snapshot = CatalogSnapshot(
+    'ingredients',
+    lambda: IngredientSerializer(Ingredient.objects.all(), many=True).data,
+)
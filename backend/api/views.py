@@ -1,25 +1,38 @@
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import FileResponse
+from django.db.models import (BooleanField, Prefetch, Value,
+                              prefetch_related_objects)
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import status
+from rest_framework import generics, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from .cook_index import recipe_ingredient_index
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import MainPagePagination
+from .ingredient_index import ingredient_index
+from .pagination import KeysetPagination, MainPagePagination
 from .permissions import AuthorOrReadOnly
-from .serializers import (CurrentUserSerializer, IngredientSerializer,
-                          RecipeGetSerializer, RecipePostSerializer,
-                          RecipeSerializer, SubscriptionsGetSerializer,
-                          TagSerializer)
+from .readers import (RECIPE_FIELDS, SUBSCRIPTION_FIELDS, recipe_data,
+                      subscription_data)
+from .renderers import CSVRenderer, PlainTextRenderer
+from .response_cache import recipe_pages_cache
+from .serializers import (CookRecipeSerializer, CurrentUserSerializer,
+                          IngredientSerializer, RecipeGetSerializer,
+                          RecipePostSerializer, RecipeSerializer,
+                          SubscriptionsGetSerializer, TagSerializer)
+from .shopping_list import CONTENT_TYPES, STREAMS
+from .snapshots import ingredients_snapshot, tags_snapshot
 
-from recipes.models import (AmountIngredientRecipe, Favorite, Ingredient,
-                            Recipe, ShoppingCart, Tag)
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from users.models import Subscription
 
 
@@ -31,6 +44,7 @@ class SubscribePost(UserViewSet):
     queryset = User.objects.all()
     serializer_class = CurrentUserSerializer
     pagination_class = MainPagePagination
+    keyset_ordering = ('username', 'id')
 
     @action(
         detail=True,
@@ -68,8 +82,24 @@ class SubscribePost(UserViewSet):
     def subscriptions(self, request):
         """Список подписок пользоваетеля."""
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True, BooleanField()),
+        ).order_by('username')
+        limit = request.GET.get('recipes_limit')
+        limit = int(limit) if limit else None
+        if settings.LEAN_READ_SERIALIZERS:
+            rows = self.paginate_queryset(
+                queryset.values(*SUBSCRIPTION_FIELDS))
+            return self.get_paginated_response(subscription_data(rows, limit))
         pages = self.paginate_queryset(queryset)
+        recipes = Recipe.objects.all()
+        if limit is not None:
+            recipes = Recipe.objects.latest_by_authors(
+                [author.id for author in pages], limit)
+        prefetch_related_objects(
+            pages,
+            Prefetch('recipes', queryset=recipes, to_attr='shown_recipes'),
+        )
         serializer = SubscriptionsGetSerializer(
             pages,
             many=True,
@@ -87,6 +117,18 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Полный список отдается из готового снимка, подсказки по
+        названию - из индекса в памяти. Пустое название, как и в
+        фильтре, означает полный список."""
+        name = request.query_params.get('name')
+        if not name and request.accepted_renderer.format == 'json':
+            return ingredients_snapshot.response(request)
+        if not name or not settings.INGREDIENT_INDEX_ENABLED:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_index.search(
+            name, limit=settings.INGREDIENT_SEARCH_LIMIT))
+
 
 class TagViewSet(ReadOnlyModelViewSet):
     """Представление тэгов."""
@@ -95,15 +137,61 @@ class TagViewSet(ReadOnlyModelViewSet):
     permission_classes = (AllowAny,)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Список тегов отдается из готового снимка."""
+        if request.accepted_renderer.format == 'json':
+            return tags_snapshot.response(request)
+        return super().list(request, *args, **kwargs)
+
 
 class RecipeViewSet(ModelViewSet):
     """ Представление рецепта."""
     queryset = Recipe.objects.all()
     permission_classes = (AuthorOrReadOnly,)
     pagination_class = MainPagePagination
+    keyset_ordering = ('-pub_date', '-id')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """Для чтения подгружает связанные объекты.
+
+        Флаги избранного и корзины берутся из кэша множеств рецептов
+        пользователя (recipes.memberships).
+        """
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.with_related(self.request.user)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if settings.LEAN_READ_SERIALIZERS:
+            return recipe_pages_cache.respond(
+                request, partial(self.lean_list, request))
+        return recipe_pages_cache.respond(
+            request, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        if settings.LEAN_READ_SERIALIZERS:
+            return recipe_pages_cache.respond(
+                request, partial(self.lean_retrieve, request))
+        return recipe_pages_cache.respond(
+            request, partial(super().retrieve, request, *args, **kwargs))
+
+    def lean_list(self, request):
+        """Список рецептов из строк .values() без сериализаторов."""
+        queryset = self.filter_queryset(super().get_queryset())
+        rows = self.paginate_queryset(queryset.values(*RECIPE_FIELDS))
+        return self.get_paginated_response(recipe_data(rows, request))
+
+    def lean_retrieve(self, request):
+        """Рецепт из строки .values() без сериализаторов."""
+        row = generics.get_object_or_404(
+            Recipe.objects.values(*RECIPE_FIELDS),
+            pk=self.kwargs[self.lookup_field],
+        )
+        return Response(recipe_data([row], request)[0])
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -166,23 +254,83 @@ class RecipeViewSet(ModelViewSet):
         methods=['GET'],
         permission_classes=[IsAuthenticated]
     )
+    def feed(self, request):
+        """Лента новых рецептов авторов из подписок пользователя."""
+        user = request.user
+        paginator = KeysetPagination()
+        if settings.LEAN_READ_SERIALIZERS:
+            rows = paginator.paginate_queryset(
+                Recipe.objects.feed(user).values(*RECIPE_FIELDS),
+                request, self)
+            return paginator.get_paginated_response(
+                recipe_data(rows, request))
+        recipes = paginator.paginate_queryset(
+            Recipe.objects.feed(user).with_related(user), request, self)
+        serializer = RecipeGetSerializer(
+            recipes,
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def cook(self, request):
+        """Что приготовить из имеющихся ингредиентов.
+
+        Рецепты сортируются по доле ингредиентов, которые есть у
+        пользователя, с количеством недостающих.
+        """
+        try:
+            ingredient_ids = [
+                int(value)
+                for values in request.query_params.getlist('ingredients')
+                for value in values.split(',') if value
+            ]
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Укажите id ингредиентов числами.'})
+        if not ingredient_ids:
+            raise ValidationError(
+                {'ingredients': 'Укажите хотя бы один ингредиент.'})
+        try:
+            limit = min(int(request.query_params.get(
+                'limit', settings.COOK_RESULTS_LIMIT)), 100)
+        except ValueError:
+            raise ValidationError({'limit': 'Укажите лимит целым числом.'})
+        top = recipe_ingredient_index.top(ingredient_ids, max(limit, 0))
+        recipes = Recipe.objects.in_bulk([recipe_id for recipe_id, *_ in top])
+        serializer = CookRecipeSerializer(
+            [recipes[recipe_id] for recipe_id, *_ in top
+             if recipe_id in recipes],
+            many=True,
+            context={
+                'request': request,
+                'matches': {
+                    recipe_id: (matched, missing)
+                    for recipe_id, matched, missing in top
+                },
+            },
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer],
+    )
     def download_shopping_cart(self, request):
-        """Скачать рецепты."""
-        ingredients = AmountIngredientRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).order_by('ingredient__name').annotate(amount=Sum('amount'))
-
-        shopping_list = (
-            f'Список покупок для: {request.user.get_full_name()}\n\n'
+        """Скачать рецепты.
+
+        Формат (txt, csv, json) выбирается параметром format или
+        заголовком Accept, файл отдается потоком.
+        """
+        file_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            STREAMS[file_format](request.user),
+            content_type=CONTENT_TYPES[file_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping.{file_format}"'
         )
-        shopping_list += '\n'.join([
-            f'- {ingredient["ingredient__name"]} '
-            f'({ingredient["ingredient__measurement_unit"]})'
-            f' - {ingredient["amount"]}'
-            for ingredient in ingredients
-        ])
-        response = FileResponse(shopping_list, content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename="shopping.txt"'
         return response
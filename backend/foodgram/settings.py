@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +79,20 @@ DATABASES = {
     }
 }
 
+# По умолчанию кэш в памяти процесса: его хватает для одного процесса
+# gunicorn. Кэш токенов, избранного и ответов сбрасывается по ключу и
+# опирается на атомарный add(), поэтому при нескольких процессах или
+# контейнерах нужен общий Memcached (сервис memcached в docker-compose):
+# CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+# CACHE_LOCATION=memcached:11211
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -114,19 +129,51 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.User'
 
 
+# orjson для JSON API, если установлен; без него - стандартный json.
+FAST_JSON = os.getenv('FAST_JSON', 'True') == 'True'
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer' if FAST_JSON
+        else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser' if FAST_JSON
+        else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.MainPagePagination',
     'PAGE_SIZE': 6,
     'MAX_PAGE_SIZE': 10,
 }
 
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+
+# Чтение рецептов и подписок через .values() вместо сериализаторов DRF.
+# Перед включением сверьте ответы командой check_lean_serializers.
+LEAN_READ_SERIALIZERS = (
+    os.getenv('LEAN_READ_SERIALIZERS', 'False') == 'True'
+)
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60))
+RESPONSE_CACHE_STALE = int(os.getenv('RESPONSE_CACHE_STALE', 10))
+
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 30)
+)
+PAGINATION_COUNT_ESTIMATE = (
+    os.getenv('PAGINATION_COUNT_ESTIMATE', 'False') == 'True'
+)
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USER': 'True',
@@ -140,3 +187,40 @@ DJOSER = {
 }
 
 EMPTY_VALUE = 'не задано'
+
+INGREDIENT_INDEX_ENABLED = (
+    os.getenv('INGREDIENT_INDEX_ENABLED', 'True') == 'True'
+)
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', 50))
+
+CATALOG_SNAPSHOT_MAX_AGE = int(os.getenv('CATALOG_SNAPSHOT_MAX_AGE', 300))
+
+MEMBERSHIP_CACHE_BACKEND = os.getenv('MEMBERSHIP_CACHE_BACKEND', 'django')
+MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv('MEMBERSHIP_CACHE_TIMEOUT', 300))
+MEMBERSHIP_CACHE_MAX_USERS = int(
+    os.getenv('MEMBERSHIP_CACHE_MAX_USERS', 10000)
+)
+
+QUERY_TIMING_ENABLED = os.getenv('QUERY_TIMING_ENABLED', 'False') == 'True'
+QUERY_TIMING_REPEATS = int(os.getenv('QUERY_TIMING_REPEATS', 5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+COOK_RESULTS_LIMIT = int(os.getenv('COOK_RESULTS_LIMIT', 10))
+
+IMAGE_VARIANTS_WORKERS = int(os.getenv('IMAGE_VARIANTS_WORKERS', 2))
@@ -5,6 +5,8 @@ from django.forms.models import BaseInlineFormSet
 
 from .models import (AmountIngredientRecipe, Favorite, Ingredient, Recipe,
                      ShoppingCart, Tag)
+from .paginator import AdminPaginator
+from .versions import log_ingredients_change
 
 
 @admin.register(Tag)
@@ -20,6 +22,8 @@ class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
     search_fields = ('name',)
     empty_value_display = settings.EMPTY_VALUE
+    paginator = AdminPaginator
+    show_full_result_count = False
 
 
 class ShowIngredientRecipeFormSet(BaseInlineFormSet):
@@ -41,35 +45,54 @@ class ShowIngredientRecipe(admin.TabularInline):
     extra = 0
     min_num = 1
     formset = ShowIngredientRecipeFormSet
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     """Отображение в админ зоне рецептов."""
-    list_display = ('name', 'author', 'amount_favorites')
-    list_filter = ('author', 'tags')
-    search_fields = ('author', 'name', 'tags')
+    list_display = ('name', 'author', 'amount_favorites', 'in_carts_count')
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    search_fields = ('name', 'author__username', 'author__email')
+    autocomplete_fields = ('author',)
     inlines = (ShowIngredientRecipe, )
     empty_value_display = settings.EMPTY_VALUE
+    paginator = AdminPaginator
+    show_full_result_count = False
 
-    @admin.display(description='Отмечен как избранное.')
+    def save_related(self, request, form, formsets, change):
+        """Сохраняет ингредиенты и пишет одну запись в журнал состава."""
+        super().save_related(request, form, formsets, change)
+        log_ingredients_change(form.instance.pk)
+
+    @admin.display(
+        description='Отмечен как избранное.', ordering='favorites_count'
+    )
     def amount_favorites(self, obj):
         """Количество добавлений в избранное."""
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     """Отображение в админ зоне списка покупок."""
     list_display = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'user__email', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
     empty_value_display = settings.EMPTY_VALUE
+    paginator = AdminPaginator
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     """Отображение в админ зоне избранное."""
     list_display = ('user', 'recipe')
-    search_fields = ('user', 'recipe',)
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'user__email', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
     empty_value_display = settings.EMPTY_VALUE
+    paginator = AdminPaginator
+    show_full_result_count = False
@@ -0,0 +1,36 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def actual_count(related_model, related_field):
+    """Подзапрос с фактическим количеством связанных строк."""
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(
+                **{related_field: OuterRef('pk')}
+            ).order_by().values(related_field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0,
+    )
+
+
+def recount(recipe_model, user_model, favorite_model, shopping_cart_model):
+    """Пересчитывает счетчики рецептов и авторов.
+
+    Обновляются только разошедшиеся строки; возвращает их количество
+    по каждому счетчику.
+    """
+    counters = (
+        (recipe_model, 'favorites_count', favorite_model, 'recipe'),
+        (recipe_model, 'in_carts_count', shopping_cart_model, 'recipe'),
+        (user_model, 'recipes_count', recipe_model, 'author'),
+    )
+    fixed = {}
+    for model, field, related_model, related_field in counters:
+        actual = actual_count(related_model, related_field)
+        fixed[field] = model.objects.exclude(
+            **{field: actual}
+        ).update(**{field: actual})
+    return fixed
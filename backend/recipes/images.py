@@ -0,0 +1,123 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .models import Recipe
+from .versions import bump_version
+
+VARIANTS_DIR = 'variants'
+VARIANTS = {
+    'card': (600, 600),
+    'thumbnail': (200, 200),
+}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = Lock()
+
+
+def variant_names(name):
+    """Имена файлов всех вариантов изображения.
+
+    Ключи - card, card_webp, thumbnail, thumbnail_webp.
+    """
+    directory, filename = os.path.split(name)
+    stem, extension = os.path.splitext(filename)
+    names = {}
+    for variant in VARIANTS:
+        base = os.path.join(directory, VARIANTS_DIR, f'{stem}_{variant}')
+        names[variant] = base + extension
+        names[f'{variant}_webp'] = base + '.webp'
+    return names
+
+
+def mark_variants_ready(name):
+    """Отмечает у рецептов с изображением name, что варианты готовы.
+
+    Ответы API строят ссылки на варианты по этой отметке, не обращаясь
+    к хранилищу.
+    """
+    if Recipe.objects.filter(image=name).exclude(
+            variants_image=name).update(variants_image=name):
+        bump_version('recipe_pages')
+
+
+def generate_variants(name, force=False, storage=default_storage):
+    """Создает уменьшенные копии изображения и их WebP-версии и отмечает
+    их готовность у рецептов.
+
+    Возвращает количество записанных файлов.
+    """
+    names = variant_names(name)
+    if not force and all(storage.exists(path) for path in names.values()):
+        mark_variants_ready(name)
+        return 0
+    with storage.open(name, 'rb') as file:
+        original = Image.open(file)
+        original.load()
+    image_format = original.format or 'PNG'
+    written = 0
+    for variant, size in VARIANTS.items():
+        image = original.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        for path, variant_format in (
+            (names[variant], image_format),
+            (names[f'{variant}_webp'], 'WEBP'),
+        ):
+            prepared = image
+            if variant_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                prepared = image.convert('RGB')
+            buffer = io.BytesIO()
+            prepared.save(buffer, format=variant_format)
+            if storage.exists(path):
+                storage.delete(path)
+            storage.save(path, ContentFile(buffer.getvalue()))
+            written += 1
+    mark_variants_ready(name)
+    return written
+
+
+def delete_variants(name, storage=default_storage):
+    """Удаляет варианты изображения."""
+    for path in variant_names(name).values():
+        if storage.exists(path):
+            storage.delete(path)
+
+
+def get_executor():
+    """Пул потоков, в котором варианты создаются вне обработки запроса."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANTS_WORKERS,
+                thread_name_prefix='image-variants',
+            )
+    return _executor
+
+
+def _run(task, name):
+    try:
+        task(name)
+    except Exception:
+        logger.exception('Не удалось обработать варианты %s', name)
+
+
+def schedule_variants(name):
+    """Ставит создание вариантов изображения в очередь пула."""
+    if name:
+        get_executor().submit(_run, generate_variants, name)
+
+
+def schedule_delete_variants(name):
+    """Ставит удаление вариантов изображения в очередь пула."""
+    if name:
+        get_executor().submit(_run, delete_variants, name)
@@ -0,0 +1,251 @@
+import base64
+import io
+import json
+import platform
+from datetime import datetime
+from itertools import combinations
+from time import perf_counter
+
+import django
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(index)]
+
+
+def image_payload():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), 'orange').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный замер API через тестовый клиент: задержки '
+            'p50/p95/p99, пропускная способность и запросы к базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Количество замеряемых запросов на сценарий.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Количество незамеряемых запросов перед замером.'
+        )
+        parser.add_argument(
+            '--user',
+            help='Email пользователя; по умолчанию - пользователь с '
+                 'наибольшим числом подписок.'
+        )
+        parser.add_argument(
+            '--only', action='append', default=[],
+            help='Запускать только сценарии, имя которых содержит строку.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для результатов в формате JSON.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON предыдущего запуска для сравнения p95.'
+        )
+        parser.add_argument(
+            '--max-regression', type=float, default=20.0,
+            help='Допустимый рост p95 в процентах при сравнении.'
+        )
+
+    def get_user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {email} не найден.')
+        user = User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        return user
+
+    def read_scenarios(self):
+        """Сценарии чтения: (имя, метод, адрес, данные)."""
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        if recipe is None:
+            raise CommandError('В базе нет рецептов.')
+        ingredient = recipe.ingredients.first()
+        tag = Tag.objects.first()
+        filters = {
+            'tags': f'tags={tag.slug}' if tag else None,
+            'author': f'author={recipe.author_id}',
+            'is_favorited': 'is_favorited=1',
+            'is_in_shopping_cart': 'is_in_shopping_cart=1',
+            'search': f'search={recipe.name.split()[0]}',
+        }
+        filters = {name: query for name, query in filters.items() if query}
+        scenarios = [('recipes', 'get', '/api/recipes/', None)]
+        for size in range(1, len(filters) + 1):
+            for names in combinations(filters, size):
+                query = '&'.join(filters[name] for name in names)
+                scenarios.append((
+                    f'recipes?{"+".join(names)}', 'get',
+                    f'/api/recipes/?{query}', None,
+                ))
+        scenarios += [
+            ('recipes?cursor', 'get', '/api/recipes/?cursor=', None),
+            ('recipe_detail', 'get', f'/api/recipes/{recipe.id}/', None),
+            ('ingredients?name', 'get',
+             f'/api/ingredients/?name={ingredient.name[:3]}'
+             if ingredient else '/api/ingredients/?name=а', None),
+            ('subscriptions', 'get',
+             '/api/users/subscriptions/?recipes_limit=3', None),
+            ('download_shopping_cart', 'get',
+             '/api/recipes/download_shopping_cart/', None),
+        ]
+        return scenarios
+
+    def write_data(self):
+        tags = list(Tag.objects.values_list('id', flat=True)[:2])
+        ingredients = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)[:6]
+        )
+        if not tags or not ingredients:
+            raise CommandError('Для записи нужны теги и ингредиенты.')
+        return {
+            'tags': tags,
+            'ingredients': [
+                {'id': pk, 'amount': index + 1}
+                for index, pk in enumerate(ingredients)
+            ],
+            'image': image_payload(),
+            'name': 'Замер производительности',
+            'text': 'Рецепт создан командой benchmark_api.',
+            'cooking_time': 10,
+        }
+
+    def request(self, client, method, path, data):
+        if data is None:
+            response = getattr(client, method)(path)
+        else:
+            response = getattr(client, method)(path, data, format='json')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{method.upper()} {path}: {response.status_code}')
+        return response
+
+    def measure(self, client, method, path, data, options):
+        for _ in range(options['warmup']):
+            self.request(client, method, path, data)
+        timings = []
+        queries = 0
+        started = perf_counter()
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as context:
+                request_started = perf_counter()
+                self.request(client, method, path, data)
+                timings.append((perf_counter() - request_started) * 1000)
+            queries += len(context.captured_queries)
+        elapsed = perf_counter() - started
+        timings.sort()
+        return {
+            'path': path,
+            'method': method.upper(),
+            'requests': len(timings),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'throughput_rps': round(len(timings) / elapsed, 1),
+            'queries_per_request': round(queries / len(timings), 2),
+        }
+
+    def run(self, client, user, options):
+        scenarios = self.read_scenarios()
+        only = options['only']
+        created = []
+        results = {}
+        try:
+            data = self.write_data()
+            response = self.request(client, 'post', '/api/recipes/', data)
+            created.append(response.data['id'])
+            scenarios += [
+                ('recipe_create', 'post', '/api/recipes/', data),
+                ('recipe_update', 'patch',
+                 f'/api/recipes/{created[0]}/', data),
+            ]
+            for name, method, path, payload in scenarios:
+                if only and not any(part in name for part in only):
+                    continue
+                results[name] = self.measure(
+                    client, method, path, payload, options)
+                self.stdout.write(
+                    f'{name}: p50 {results[name]["p50_ms"]} мс, '
+                    f'p95 {results[name]["p95_ms"]} мс, '
+                    f'p99 {results[name]["p99_ms"]} мс, '
+                    f'{results[name]["throughput_rps"]} rps, '
+                    f'запросов {results[name]["queries_per_request"]}'
+                )
+        finally:
+            Recipe.objects.filter(
+                author=user, name='Замер производительности').delete()
+        return results
+
+    def compare(self, results, path, max_regression):
+        try:
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)['scenarios']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if not previous or not previous['p95_ms']:
+                continue
+            change = (result['p95_ms'] / previous['p95_ms'] - 1) * 100
+            queries = (result['queries_per_request']
+                       - previous['queries_per_request'])
+            self.stdout.write(
+                f'{name}: p95 {change:+.1f}%, запросов {queries:+.2f}')
+            if change > max_regression or queries > 0:
+                regressions.append(name)
+        return regressions
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля.')
+        user = self.get_user(options['user'])
+        client = APIClient()
+        client.force_authenticate(user)
+        results = self.run(client, user, options)
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+        if options['compare']:
+            regressions = self.compare(
+                results, options['compare'], options['max_regression'])
+            if regressions:
+                raise CommandError(
+                    'Замедлились сценарии: ' + ', '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Замер завершен.'))
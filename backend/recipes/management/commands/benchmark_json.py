@@ -0,0 +1,81 @@
+import io
+from datetime import datetime
+from decimal import Decimal
+from time import perf_counter
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.readers import RECIPE_FIELDS, recipe_data
+from api.renderers import FastJSONParser, FastJSONRenderer, orjson
+from api.serializers import IngredientSerializer
+from recipes.models import Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость JSONRenderer/JSONParser DRF и '
+            'FastJSONRenderer/FastJSONParser на данных API')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Количество повторов каждого замера.'
+        )
+
+    def payloads(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = AnonymousUser()
+        recipes = recipe_data(
+            Recipe.objects.values(*RECIPE_FIELDS)[:50], request)
+        return {
+            'ingredients': IngredientSerializer(
+                Ingredient.objects.all(), many=True).data,
+            'recipes_page': {
+                'count': len(recipes), 'next': None, 'previous': None,
+                'results': recipes,
+            },
+            'types': [
+                {
+                    'decimal': Decimal('12.50'),
+                    'datetime': timezone.now(),
+                    'naive': datetime(2022, 1, 1, 12, 30),
+                    'lazy': Recipe._meta.verbose_name,
+                    'ids': {1: 'один', 2: 'два'},
+                }
+                for _ in range(100)
+            ],
+        }
+
+    def measure(self, function, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            function()
+        return (perf_counter() - started) / repeat * 1e6
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.stdout.write(
+            'orjson: ' + (orjson.__version__ if orjson else 'не установлен'))
+        standard, fast = JSONRenderer(), FastJSONRenderer()
+        for name, data in self.payloads().items():
+            expected = standard.render(data)
+            same = fast.render(data) == expected
+            render_standard = self.measure(
+                lambda: standard.render(data), repeat)
+            render_fast = self.measure(lambda: fast.render(data), repeat)
+            parse_standard = self.measure(
+                lambda: JSONParser().parse(io.BytesIO(expected)), repeat)
+            parse_fast = self.measure(
+                lambda: FastJSONParser().parse(io.BytesIO(expected)), repeat)
+            self.stdout.write(
+                f'{name} ({len(expected)} байт, '
+                f'{"совпадает" if same else "ОТЛИЧАЕТСЯ"}): '
+                f'render {render_standard:.0f} -> {render_fast:.0f} мкс '
+                f'(x{render_standard / render_fast:.1f}), '
+                f'parse {parse_standard:.0f} -> {parse_fast:.0f} мкс '
+                f'(x{parse_standard / parse_fast:.1f})'
+            )
@@ -0,0 +1,82 @@
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает побайтно ответы API при чтении через сериализаторы '
+            'и через строки .values() (LEAN_READ_SERIALIZERS)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=20,
+            help='Сколько рецептов проверить по одному.'
+        )
+
+    def get_paths(self, recipes):
+        tag = Tag.objects.first()
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        paths = [
+            '/api/recipes/',
+            '/api/recipes/?page=2',
+            '/api/recipes/?cursor=',
+            '/api/recipes/?limit=10&is_favorited=1',
+            '/api/recipes/?is_in_shopping_cart=1',
+            '/api/recipes/feed/',
+            '/api/users/subscriptions/',
+            '/api/users/subscriptions/?recipes_limit=2',
+            '/api/users/subscriptions/?recipes_limit=0',
+        ]
+        if tag:
+            paths.append(f'/api/recipes/?tags={tag.slug}')
+        if recipe:
+            paths += [
+                f'/api/recipes/?author={recipe.author_id}',
+                f'/api/recipes/?search={recipe.name.split()[0]}',
+            ]
+        paths += [
+            f'/api/recipes/{pk}/'
+            for pk in Recipe.objects.order_by('?').values_list(
+                'pk', flat=True)[:recipes]
+        ]
+        return paths
+
+    def fetch(self, client, path, lean):
+        with override_settings(
+                LEAN_READ_SERIALIZERS=lean, RESPONSE_CACHE_TIMEOUT=0):
+            response = client.get(path)
+        return response.status_code, response.content
+
+    def handle(self, *args, **options):
+        user = User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        anonymous = APIClient()
+        authorized = APIClient()
+        authorized.force_authenticate(user)
+        differences = 0
+        checked = 0
+        for path in self.get_paths(options['recipes']):
+            for name, client in (('аноним', anonymous),
+                                 ('пользователь', authorized)):
+                expected = self.fetch(client, path, lean=False)
+                actual = self.fetch(client, path, lean=True)
+                checked += 1
+                if expected != actual:
+                    differences += 1
+                    self.stderr.write(
+                        f'{path} ({name}): {expected[0]} '
+                        f'{expected[1][:300]!r}\n'
+                        f'  != {actual[0]} {actual[1][:300]!r}'
+                    )
+        if differences:
+            raise CommandError(
+                f'Ответы различаются: {differences} из {checked}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ответы совпадают побайтно: {checked}.'))
@@ -0,0 +1,141 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import User
+
+ENDPOINTS = (
+    '/api/recipes/',
+    '/api/recipes/?page=3',
+    '/api/recipes/?cursor=',
+    '/api/recipes/?author={author}',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/{recipe}/',
+    '/api/recipes/feed/',
+    '/api/recipes/download_shopping_cart/',
+    '/api/users/subscriptions/?recipes_limit=3',
+    '/api/ingredients/?name={ingredient}',
+)
+
+
+def seq_scans(plan, tables):
+    """Узлы Seq Scan по таблицам из tables во всем плане."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and (
+            plan.get('Relation Name') in tables):
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', ()):
+        found.extend(seq_scans(child, tables))
+    return found
+
+
+class Command(BaseCommand):
+    help = ('Проверяет планы запросов API: падает, если по большой таблице '
+            'выполняется последовательное чтение (только PostgreSQL)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого идут запросы; '
+                 'по умолчанию - пользователь с наибольшим числом подписок.'
+        )
+        parser.add_argument(
+            '--min-rows', type=int, default=10000,
+            help='С какого числа строк (по оценке планировщика) таблица '
+                 'считается большой.'
+        )
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Проверяемые адреса; по умолчанию - основные запросы API.'
+        )
+
+    def large_tables(self, min_rows):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname FROM pg_class "
+                "WHERE relkind = 'r' AND reltuples >= %s "
+                "AND relnamespace = 'public'::regnamespace",
+                (min_rows,),
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def get_user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {email} не найден.')
+        user = User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        return user
+
+    def get_paths(self, paths):
+        if paths:
+            return paths
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        if recipe is None:
+            raise CommandError('В базе нет рецептов.')
+        ingredient = recipe.ingredients.first()
+        return [
+            path.format(
+                recipe=recipe.id,
+                author=recipe.author_id,
+                ingredient=ingredient.name[:3] if ingredient else 'а',
+            )
+            for path in ENDPOINTS
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Планы запросов проверяются на PostgreSQL.')
+        tables = self.large_tables(options['min_rows'])
+        self.stdout.write(
+            'Большие таблицы: ' + (', '.join(sorted(tables)) or 'нет'))
+        client = APIClient()
+        client.force_authenticate(self.get_user(options['user']))
+        failures = 0
+        with override_settings(
+                ALLOWED_HOSTS=['testserver'],
+                INGREDIENT_INDEX_ENABLED=False,
+                PAGINATION_COUNT_CACHE_TIMEOUT=0):
+            for path in self.get_paths(options['paths']):
+                with CaptureQueriesContext(connection) as context:
+                    response = client.get(path)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                found = []
+                for query in context.captured_queries:
+                    if query['sql'].lstrip().upper().startswith('SELECT'):
+                        found.extend(
+                            (table, query['sql'])
+                            for table in seq_scans(
+                                self.explain(query['sql']), tables)
+                        )
+                self.stdout.write(
+                    f'{path}: {response.status_code}, '
+                    f'запросов {len(context.captured_queries)}'
+                )
+                for table, sql in found:
+                    failures += 1
+                    self.stderr.write(f'  Seq Scan по {table}: {sql}')
+        if failures:
+            raise CommandError(
+                f'Последовательное чтение больших таблиц: {failures}.')
+        self.stdout.write(self.style.SUCCESS('Планы запросов в порядке.'))
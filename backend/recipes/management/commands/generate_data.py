@@ -0,0 +1,343 @@
+import csv
+import io
+import multiprocessing
+import random
+from datetime import datetime, timedelta
+from time import monotonic
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from recipes.counters import recount
+from recipes.images import generate_variants
+from recipes.models import (AmountIngredientRecipe, Favorite, Ingredient,
+                            Recipe, ShoppingCart, Tag)
+from recipes.versions import bump_version, log_ingredients_change
+from users.models import Subscription, User
+
+IMAGE_NAME = 'recipes/synthetic.png'
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'рагу', 'запеканка', 'омлет', 'плов',
+    'борщ', 'котлеты', 'блины', 'паста', 'жаркое', 'гуляш', 'пюре',
+    'куриный', 'овощной', 'грибной', 'рыбный', 'сырный', 'домашний',
+    'быстрый', 'летний', 'острый', 'сладкий', 'печеный', 'томатный',
+)
+
+
+def skewed(rng, size, skew):
+    """Номер от 0 до size - 1 со степенным перекосом к началу.
+
+    При skew = 1 распределение равномерное; чем больше skew, тем чаще
+    выпадают первые номера ("популярные" авторы и рецепты).
+    """
+    return min(size - 1, int(size * rng.random() ** skew))
+
+
+def distinct(rng, size, count, skew):
+    """Не более count разных номеров со степенным перекосом."""
+    count = min(count, size)
+    picked = set()
+    for _ in range(count * 10):
+        if len(picked) >= count:
+            break
+        picked.add(skewed(rng, size, skew))
+    return picked
+
+
+def amount(rng, average):
+    """Случайное количество связей со средним average."""
+    return int(rng.expovariate(1 / average)) if average > 0 else 0
+
+
+def user_rows(rng, start, count, params):
+    joined = params['now'] - timedelta(days=params['days'])
+    for pk in range(start, start + count):
+        yield (
+            pk, params['password'], None, False, f'synthetic{pk}',
+            'Имя', 'Фамилия', f'synthetic{pk}@example.com', False, True,
+            joined + timedelta(seconds=rng.randrange(params['days'] * 86400)),
+            0,
+        )
+
+
+def recipe_rows(rng, start, count, params):
+    for pk in range(start, start + count):
+        name = ' '.join(rng.sample(WORDS, 3)).capitalize()
+        yield (
+            pk, name,
+            params['user_start'] + skewed(
+                rng, params['users'], params['skew']),
+            params['image'], params['image'],
+            f'{name}. ' + ' '.join(rng.choices(WORDS, k=30)),
+            rng.randint(1, 180),
+            params['now'] - timedelta(
+                seconds=rng.randrange(params['days'] * 86400)),
+            0, 0,
+        )
+
+
+def recipe_ingredient_rows(rng, start, count, params):
+    ingredients = params['ingredient_ids']
+    for recipe_id in range(start, start + count):
+        for index in distinct(
+                rng, len(ingredients),
+                max(1, amount(rng, params['ingredients_per_recipe'])),
+                params['skew']):
+            yield ingredients[index], recipe_id, rng.randint(1, 1000)
+
+
+def recipe_tag_rows(rng, start, count, params):
+    tags = params['tag_ids']
+    for recipe_id in range(start, start + count):
+        for tag_id in rng.sample(tags, rng.randint(1, min(3, len(tags)))):
+            yield recipe_id, tag_id
+
+
+def user_recipe_rows(average):
+    def rows(rng, start, count, params):
+        for user_id in range(start, start + count):
+            for index in distinct(
+                    rng, params['recipes'], amount(rng, params[average]),
+                    params['skew']):
+                yield user_id, params['recipe_start'] + index
+    return rows
+
+
+def subscription_rows(rng, start, count, params):
+    for user_id in range(start, start + count):
+        for index in distinct(
+                rng, params['users'],
+                amount(rng, params['subscriptions_per_user']),
+                params['skew']):
+            author_id = params['user_start'] + index
+            if author_id != user_id:
+                yield user_id, author_id
+
+
+# Этапы генерации: таблица, колонки, по каким строкам идет разбиение
+# на части (users или recipes) и функция, которая строит строки части.
+STAGES = {
+    'users': (
+        User._meta.db_table,
+        ('id', 'password', 'last_login', 'is_superuser', 'username',
+         'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+         'date_joined', 'recipes_count'),
+        'users', user_rows,
+    ),
+    'recipes': (
+        Recipe._meta.db_table,
+        ('id', 'name', 'author_id', 'image', 'variants_image', 'text',
+         'cooking_time', 'pub_date', 'favorites_count', 'in_carts_count'),
+        'recipes', recipe_rows,
+    ),
+    'recipe_ingredients': (
+        AmountIngredientRecipe._meta.db_table,
+        ('ingredient_id', 'recipe_id', 'amount'),
+        'recipes', recipe_ingredient_rows,
+    ),
+    'recipe_tags': (
+        Recipe.tags.through._meta.db_table,
+        ('recipe_id', 'tag_id'),
+        'recipes', recipe_tag_rows,
+    ),
+    'favorites': (
+        Favorite._meta.db_table,
+        ('user_id', 'recipe_id'),
+        'users', user_recipe_rows('favorites_per_user'),
+    ),
+    'shopping_cart': (
+        ShoppingCart._meta.db_table,
+        ('user_id', 'recipe_id'),
+        'users', user_recipe_rows('carts_per_user'),
+    ),
+    'subscriptions': (
+        Subscription._meta.db_table,
+        ('user_id', 'author_id'),
+        'users', subscription_rows,
+    ),
+}
+
+
+def write_rows(table, columns, rows):
+    """Записывает строки COPY на PostgreSQL и executemany на остальных."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f'COPY {table} ({", ".join(columns)}) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+            return
+        adapt = connection.ops.adapt_datetimefield_value
+        rows = [
+            [adapt(value) if isinstance(value, datetime) else value
+             for value in row]
+            for row in rows
+        ]
+        cursor.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))})',
+            rows,
+        )
+
+
+def load_chunk(task):
+    """Строит и записывает одну часть этапа; выполняется в процессе пула."""
+    stage, chunk, start, count, params = task
+    table, columns, _, build = STAGES[stage]
+    rng = random.Random(f'{params["seed"]}:{stage}:{chunk}')
+    rows = list(build(rng, start, count, params))
+    write_rows(table, columns, rows)
+    return len(rows)
+
+
+class Command(BaseCommand):
+    help = ('Генерирует воспроизводимый набор синтетических данных: '
+            'пользователи, рецепты, избранное, покупки и подписки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=float, default=10,
+            help='Среднее число ингредиентов в рецепте.'
+        )
+        parser.add_argument(
+            '--favorites-per-user', type=float, default=20,
+            help='Среднее число рецептов в избранном пользователя.'
+        )
+        parser.add_argument(
+            '--carts-per-user', type=float, default=5,
+            help='Среднее число рецептов в списке покупок пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions-per-user', type=float, default=10,
+            help='Среднее число подписок пользователя.'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=3.0,
+            help='Перекос популярности авторов, рецептов и ингредиентов; '
+                 '1 - равномерно.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты публикации.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Количество пользователей или рецептов в одной части.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Количество процессов (только PostgreSQL).'
+        )
+
+    def prepare_image(self):
+        """Общее изображение для всех синтетических рецептов."""
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (800, 600), 'lightgray').save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        generate_variants(IMAGE_NAME)
+        return IMAGE_NAME
+
+    def get_params(self, options):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True))
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError(
+                'Сначала загрузите ингредиенты и теги '
+                '(import_ingredients, import_tags).')
+        user_start = (User.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        recipe_start = (
+            Recipe.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        return {
+            'seed': options['seed'],
+            'users': options['users'],
+            'recipes': options['recipes'],
+            'user_start': user_start,
+            'recipe_start': recipe_start,
+            'ingredient_ids': ingredient_ids,
+            'tag_ids': tag_ids,
+            'ingredients_per_recipe': options['ingredients_per_recipe'],
+            'favorites_per_user': options['favorites_per_user'],
+            'carts_per_user': options['carts_per_user'],
+            'subscriptions_per_user': options['subscriptions_per_user'],
+            'skew': max(options['skew'], 1),
+            'days': max(options['days'], 1),
+            'now': timezone.now(),
+            'image': self.prepare_image(),
+            'password': make_password(None),
+        }
+
+    def tasks(self, stage, params, batch_size):
+        base = STAGES[stage][2]
+        start = params['user_start' if base == 'users' else 'recipe_start']
+        total = params[base]
+        for chunk, offset in enumerate(range(0, total, batch_size)):
+            yield (stage, chunk, start + offset,
+                   min(batch_size, total - offset), params)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['recipes'] < 1:
+            raise CommandError('Нужны хотя бы один пользователь и рецепт.')
+        params = self.get_params(options)
+        workers = options['workers']
+        if connection.vendor != 'postgresql':
+            workers = 1
+        started = monotonic()
+        pool = None
+        if workers > 1:
+            # Соединения не должны наследоваться дочерними процессами.
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(workers)
+        try:
+            for stage in STAGES:
+                stage_started = monotonic()
+                tasks = self.tasks(stage, params, options['batch_size'])
+                results = (
+                    pool.imap_unordered(load_chunk, tasks) if pool
+                    else map(load_chunk, tasks)
+                )
+                rows = 0
+                for written in results:
+                    rows += written
+                self.stdout.write(
+                    f'{stage}: {rows} строк '
+                    f'за {monotonic() - stage_started:.1f} с.'
+                )
+                if stage in ('users', 'recipes'):
+                    self.reset_sequences()
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        fixed = recount(Recipe, User, Favorite, ShoppingCart)
+        self.stdout.write(
+            'Счетчики пересчитаны: '
+            + ', '.join(f'{field} {rows}' for field, rows in fixed.items())
+        )
+        for name in ('users', 'recipes', 'recipe_pages'):
+            bump_version(name)
+        log_ingredients_change()
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {monotonic() - started:.1f} с.'))
+
+    def reset_sequences(self):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Recipe]):
+                cursor.execute(sql)
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.images import generate_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии и WebP-версии изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать уже существующие варианты.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.IMAGE_VARIANTS_WORKERS,
+            help='Количество потоков обработки.'
+        )
+
+    def process(self, name, force):
+        try:
+            return generate_variants(name, force=force)
+        except Exception as error:
+            self.stderr.write(f'{name}: {error}')
+            return 0
+
+    def handle(self, *args, **options):
+        names = Recipe.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct().iterator()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            written = sum(executor.map(
+                lambda name: self.process(name, options['force']), names
+            ))
+        self.stdout.write(
+            self.style.SUCCESS(f'Создано файлов вариантов: {written}')
+        )
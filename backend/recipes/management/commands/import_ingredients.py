@@ -1,22 +1,128 @@
 import csv
+import io
+import json
+import os
+from itertools import islice
+from time import monotonic
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
 from recipes.models import Ingredient
+from recipes.versions import bump_version
 
 
 class Command(BaseCommand):
     help = 'Загрузка ингредиентов'
 
-    def handle(self, *args, **kwargs):
-        with open(f'{settings.BASE_DIR}/data/ingredients.csv', 'r',
-                  encoding='utf-8') as file:
-            ingredient_file = csv.reader(file)
-            for ingredients in ingredient_file:
-                name, measurement_unit = ingredients
-                Ingredient.objects.get_or_create(
-                    name=name,
-                    measurement_unit=measurement_unit)
-
-        self.stdout.write(self.style.SUCCESS('Ингридиенты загружены.'))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Файл с ингредиентами в формате CSV или JSON.'
+        )
+        parser.add_argument(
+            '--format', choices=('csv', 'json'),
+            help='Формат файла; по умолчанию - по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество ингредиентов в одной вставке.'
+        )
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загрузка через COPY (только PostgreSQL).'
+        )
+
+    @staticmethod
+    def read_csv(file):
+        for row in csv.reader(file):
+            if row:
+                yield row[0], row[1]
+
+    @staticmethod
+    def read_json(file):
+        for item in json.load(file):
+            yield item['name'], item['measurement_unit']
+
+    @staticmethod
+    def unique(rows):
+        """Убирает повторы и пустые названия."""
+        seen = set()
+        for name, measurement_unit in rows:
+            key = (name.strip(), measurement_unit.strip())
+            if key[0] and key not in seen:
+                seen.add(key)
+                yield key
+
+    @staticmethod
+    def batches(rows, size):
+        rows = iter(rows)
+        batch = list(islice(rows, size))
+        while batch:
+            yield batch
+            batch = list(islice(rows, size))
+
+    def insert(self, batch):
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in batch),
+            ignore_conflicts=True,
+        )
+
+    def copy(self, batch):
+        """Загружает пачку через COPY во временную таблицу."""
+        table = Ingredient._meta.db_table
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS import_ingredient '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DELETE ROWS'
+            )
+            cursor.copy_expert(
+                'COPY import_ingredient (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT name, measurement_unit FROM import_ingredient '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            cursor.execute('TRUNCATE import_ingredient')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'json' if path.endswith('.json') else 'csv'
+        )
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL.')
+        load = self.copy if options['copy'] else self.insert
+        read = self.read_json if file_format == 'json' else self.read_csv
+
+        started = monotonic()
+        before = Ingredient.objects.count()
+        processed = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                with transaction.atomic():
+                    for batch in self.batches(
+                            self.unique(read(file)), options['batch_size']):
+                        load(batch)
+                        processed += len(batch)
+                        self.stdout.write(f'Обработано: {processed}')
+        except (OSError, ValueError, KeyError, IndexError) as error:
+            raise CommandError(f'Не удалось загрузить {path}: {error}')
+        bump_version('ingredients')
+
+        created = Ingredient.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингридиенты загружены: новых {created}, '
+            f'уже было {processed - created}, '
+            f'за {monotonic() - started:.2f} с.'
+        ))
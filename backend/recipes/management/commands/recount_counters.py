@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from recipes.counters import recount
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики избранного, покупок и рецептов авторов'
+
+    def handle(self, *args, **kwargs):
+        fixed = recount(Recipe, User, Favorite, ShoppingCart)
+        for field, rows in fixed.items():
+            self.stdout.write(f'{field}: исправлено строк {rows}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Favorite, ShoppingCart
+
+MEMBERSHIP_KEY = 'membership:{}:{}'
+# Метка сброшенного множества. Пока она лежит в хранилище, запрос,
+# прочитавший множество из базы до изменения, не запишет его обратно.
+INVALIDATED = 'invalidated'
+INVALIDATED_TIMEOUT = 10
+
+
+class LocalMemoryBackend:
+    """Хранилище в памяти процесса с вытеснением давно не читанных
+    пользователей и временем жизни записей.
+
+    Сброс виден только текущему процессу, поэтому при нескольких
+    процессах приложения нужен бэкенд django.
+    """
+
+    def __init__(self, timeout, max_entries):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._set(key, value, timeout)
+
+    def _set(self, key, value, timeout):
+        if timeout is None:
+            timeout = self.timeout
+        self._data[key] = (monotonic() + timeout, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def add(self, key, value):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] >= monotonic():
+                return False
+            self._set(key, value, None)
+            return True
+
+
+class DjangoCacheBackend:
+    """Хранилище в кэше Django, общее для всех процессов."""
+
+    def __init__(self, timeout, max_entries):
+        self.timeout = timeout
+
+    def get(self, key):
+        return cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        cache.set(key, value, self.timeout if timeout is None else timeout)
+
+    def add(self, key, value):
+        return cache.add(key, value, self.timeout)
+
+
+BACKENDS = {
+    'locmem': LocalMemoryBackend,
+    'django': DjangoCacheBackend,
+}
+
+_backend = None
+_backend_lock = Lock()
+
+
+def get_backend():
+    """Хранилище, выбранное в настройке MEMBERSHIP_CACHE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = BACKENDS[settings.MEMBERSHIP_CACHE_BACKEND](
+                timeout=settings.MEMBERSHIP_CACHE_TIMEOUT,
+                max_entries=settings.MEMBERSHIP_CACHE_MAX_USERS,
+            )
+    return _backend
+
+
+class RecipeMembership:
+    """Множество id рецептов пользователя в избранном или в корзине.
+
+    Множество читается из базы одним запросом и хранится в кэше до
+    добавления или удаления рецепта пользователем: сброс идет из сигналов
+    модели, поэтому срабатывает и при удалении из админки или каскадом.
+    """
+
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+
+    def key(self, user):
+        return MEMBERSHIP_KEY.format(self.name, user.pk)
+
+    def recipe_ids(self, user):
+        if not user.is_authenticated:
+            return frozenset()
+        backend = get_backend()
+        key = self.key(user)
+        cached = backend.get(key)
+        if cached is not None and cached != INVALIDATED:
+            return cached
+        recipe_ids = frozenset(self.model.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True))
+        if cached is None:
+            backend.add(key, recipe_ids)
+        return recipe_ids
+
+    def invalidate(self, user_id):
+        """Сбрасывает множество пользователя после фиксации транзакции.
+
+        Вместо удаления записывается метка INVALIDATED: множество,
+        прочитанное до фиксации, не попадет в хранилище через add().
+        """
+        key = MEMBERSHIP_KEY.format(self.name, user_id)
+        transaction.on_commit(
+            lambda: get_backend().set(key, INVALIDATED, INVALIDATED_TIMEOUT))
+
+
+favorites = RecipeMembership(Favorite, 'favorites')
+shopping_cart = RecipeMembership(ShoppingCart, 'shopping_cart')
+
+MEMBERSHIPS = {
+    Favorite: favorites,
+    ShoppingCart: shopping_cart,
+}
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:42
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+MAX_AMOUNT = 10000
+
+
+def merge_duplicates(apps, schema_editor):
+    """Сливает ингредиенты с одинаковыми названием и единицей измерения
+    в ингредиент с наименьшим id.
+
+    Строки рецептов переводятся на оставшийся ингредиент; если он уже
+    есть в том же рецепте, количества складываются, чтобы не нарушить
+    уникальность пары рецепт-ингредиент.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    AmountIngredientRecipe = apps.get_model(
+        'recipes', 'AmountIngredientRecipe')
+    groups = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        kept_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1).order_by()
+    for group in groups:
+        kept_id = group['kept_id']
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit'],
+        ).exclude(id=kept_id).values_list('id', flat=True))
+        rows = AmountIngredientRecipe.objects.filter(
+            ingredient_id__in=duplicate_ids).order_by('id')
+        for row in rows:
+            kept = AmountIngredientRecipe.objects.filter(
+                recipe_id=row.recipe_id, ingredient_id=kept_id).first()
+            if kept is None:
+                row.ingredient_id = kept_id
+                row.save(update_fields=('ingredient',))
+                continue
+            kept.amount = min(kept.amount + row.amount, MAX_AMOUNT)
+            kept.save(update_fields=('amount',))
+            row.delete()
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+    # Ограничение добавляется после фиксации слияния: PostgreSQL не дает
+    # менять таблицу с отложенными проверками внешних ключей.
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicates, migrations.RunPython.noop, atomic=True),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
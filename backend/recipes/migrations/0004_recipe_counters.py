@@ -0,0 +1,53 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счетчики по историческим моделям, не завися от
+    текущего кода recipes.counters."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    counters = (
+        (Recipe, 'favorites_count',
+         apps.get_model('recipes', 'Favorite'), 'recipe'),
+        (Recipe, 'in_carts_count',
+         apps.get_model('recipes', 'ShoppingCart'), 'recipe'),
+        (apps.get_model(settings.AUTH_USER_MODEL), 'recipes_count',
+         Recipe, 'author'),
+    )
+    for model, field, related_model, related_field in counters:
+        model.objects.update(**{field: Coalesce(
+            Subquery(
+                related_model.objects.filter(
+                    **{related_field: OuterRef('pk')}
+                ).order_by().values(related_field).annotate(
+                    total=Count('pk')
+                ).values('total')
+            ),
+            0,
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredient_unique_name_unit'),
+        ('users', '0002_user_recipes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
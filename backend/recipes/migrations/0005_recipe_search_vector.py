@@ -0,0 +1,58 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:44
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+CREATE_SEARCH = """
+CREATE FUNCTION recipes_recipe_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update();
+
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(text, '')), 'B');
+
+CREATE INDEX recipes_recipe_search_vector_gin
+    ON recipes_recipe USING gin (search_vector);
+"""
+
+DROP_SEARCH = """
+DROP INDEX IF EXISTS recipes_recipe_search_vector_gin;
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger ON recipes_recipe;
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update();
+"""
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
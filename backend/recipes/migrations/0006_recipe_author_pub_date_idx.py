@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+    ]
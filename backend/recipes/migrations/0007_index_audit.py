@@ -0,0 +1,49 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Для name__istartswith PostgreSQL строит UPPER("name"::text) LIKE 'X%',
+# индекс должен повторять это выражение.
+CREATE_NAME_INDEX = """
+CREATE INDEX IF NOT EXISTS recipes_ingredient_name_upper_like
+    ON recipes_ingredient (UPPER(name::text) text_pattern_ops);
+"""
+
+DROP_NAME_INDEX = """
+DROP INDEX IF EXISTS recipes_ingredient_name_upper_like;
+"""
+
+
+def create_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_NAME_INDEX)
+
+
+def drop_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_NAME_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_author_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='amountingredientrecipe',
+            index=models.Index(fields=['ingredient', 'recipe'], name='ingredient_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='amountingredientrecipe',
+            name='ingredient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient', verbose_name='Ингредиент'),
+        ),
+        migrations.RunPython(create_name_index, drop_name_index),
+    ]
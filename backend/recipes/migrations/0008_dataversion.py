@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_index_audit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Набор данных')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия данных',
+                'verbose_name_plural': 'Версии данных',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIngredientsChange',
+            fields=[
+                ('version', models.PositiveBigIntegerField(primary_key=True, serialize=False, verbose_name='Номер изменения')),
+                ('recipe_id', models.BigIntegerField(help_text='Пусто, если изменились все рецепты.', null=True, verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Изменение состава рецепта',
+                'verbose_name_plural': 'Изменения состава рецептов',
+                'ordering': ('version',),
+            },
+        ),
+    ]
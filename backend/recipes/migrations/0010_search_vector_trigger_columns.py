@@ -0,0 +1,31 @@
+from django.db import migrations
+
+TRIGGER = """
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger ON recipes_recipe;
+CREATE TRIGGER recipes_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE {} ON recipes_recipe
+    FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update();
+"""
+
+
+def only_text_columns(apps, schema_editor):
+    """Вектор пересчитывается только при изменении названия или
+    описания, а не при каждом обновлении счетчиков рецепта."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(TRIGGER.format('OF name, text'))
+
+
+def all_columns(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(TRIGGER.format(''))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipeingredientschange'),
+    ]
+
+    operations = [
+        migrations.RunPython(only_text_columns, all_columns),
+    ]
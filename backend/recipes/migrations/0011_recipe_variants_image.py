@@ -0,0 +1,44 @@
+# Generated by Django 3.2.16 on 2026-10-18 05:24
+
+import os
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# Имена вариантов как в recipes.images на момент миграции.
+VARIANTS = ('card', 'thumbnail')
+
+
+def variant_paths(name):
+    directory, filename = os.path.split(name)
+    stem, extension = os.path.splitext(filename)
+    for variant in VARIANTS:
+        base = os.path.join(directory, 'variants', f'{stem}_{variant}')
+        yield base + extension
+        yield base + '.webp'
+
+
+def mark_existing(apps, schema_editor):
+    """Отмечает рецепты, варианты изображений которых уже созданы."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    names = Recipe.objects.exclude(image='').values_list(
+        'image', flat=True).distinct().iterator()
+    for name in names:
+        if all(default_storage.exists(path) for path in variant_paths(name)):
+            Recipe.objects.filter(image=name).update(variants_image=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_search_vector_trigger_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='variants_image',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Изображение с готовыми вариантами'),
+        ),
+        migrations.RunPython(mark_existing, migrations.RunPython.noop),
+    ]
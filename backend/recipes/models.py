@@ -1,8 +1,15 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
 
 from django.db import models
+from django.db.models import (Exists, F, OuterRef, Prefetch, Value,
+                              Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from users.models import Subscription
 
 User = get_user_model()
 
@@ -23,6 +30,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name', )
+        constraints = [
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -60,6 +73,61 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Выборки рецептов для чтения через API."""
+
+    def with_related(self, user):
+        """Подгружает теги, ингредиенты и автора фиксированным
+        числом запросов, независимо от размера страницы."""
+        authors = User.objects.all()
+        if user.is_anonymous:
+            authors = authors.annotate(
+                is_subscribed=Value(False, models.BooleanField()))
+        else:
+            authors = authors.annotate(
+                is_subscribed=Exists(Subscription.objects.filter(
+                    user=user, author=OuterRef('pk'))))
+        return self.defer('search_vector').prefetch_related(
+            'tags',
+            Prefetch('author', queryset=authors),
+            Prefetch(
+                'ingredients_in_recipe',
+                queryset=AmountIngredientRecipe.objects.select_related(
+                    'ingredient').order_by('id')
+            ),
+        )
+
+    def feed(self, user):
+        """Рецепты авторов, на которых подписан пользователь.
+
+        Подписки передаются подзапросом, а не списком id, поэтому размер
+        запроса не зависит от числа авторов.
+        """
+        return self.filter(author__in=Subscription.objects.filter(
+            user=user).values('author')).defer('search_vector')
+
+    def latest_by_authors(self, author_ids, limit):
+        """Не более limit последних рецептов каждого автора.
+
+        Рецепты нумеруются ROW_NUMBER() в разрезе автора, поэтому для
+        всей страницы подписок нужен один запрос.
+        """
+        if not author_ids:
+            return self.none()
+        ranked = self.filter(author_id__in=author_ids).annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=F('pub_date').desc(),
+            )
+        ).order_by().values('pk', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(pk__in=RawSQL(
+            f'SELECT id FROM ({sql}) ranked WHERE row_number <= %s',
+            (*params, limit),
+        ))
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
     name = models.CharField(
@@ -76,6 +144,13 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='recipes/',
     )
+    variants_image = models.CharField(
+        verbose_name='Изображение с готовыми вариантами',
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Описание',
     )
@@ -106,11 +181,38 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -128,7 +230,8 @@ class AmountIngredientRecipe(models.Model):
         Ingredient,
         verbose_name='Ингредиент',
         on_delete=models.CASCADE,
-        blank=False
+        blank=False,
+        db_index=False,
     )
     amount = models.PositiveSmallIntegerField(
         verbose_name='Количество',
@@ -153,6 +256,12 @@ class AmountIngredientRecipe(models.Model):
                 name='unique_recipe_ingredient',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='ingredient_recipe_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.amount} - {self.ingredient}'
@@ -206,3 +315,52 @@ class ShoppingCart(FavoriteAndShoppingCart):
                 name='unique_shopping_cart'
             )
         ]
+
+
+class DataVersion(models.Model):
+    """Версия набора данных для сброса кэшей.
+
+    Хранится в базе, поэтому общая для всех процессов, не вытесняется
+    и только растет.
+    """
+    name = models.CharField(
+        verbose_name='Набор данных',
+        max_length=50,
+        primary_key=True,
+    )
+    version = models.PositiveBigIntegerField(
+        verbose_name='Версия',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class RecipeIngredientsChange(models.Model):
+    """Журнал изменений состава рецептов для индексов в памяти процессов.
+
+    Номера записей идут подряд и в порядке фиксации транзакций, поэтому
+    процесс может дочитать журнал с последнего примененного номера.
+    """
+    version = models.PositiveBigIntegerField(
+        verbose_name='Номер изменения',
+        primary_key=True,
+    )
+    recipe_id = models.BigIntegerField(
+        verbose_name='Рецепт',
+        null=True,
+        help_text='Пусто, если изменились все рецепты.',
+    )
+
+    class Meta:
+        verbose_name = 'Изменение состава рецепта'
+        verbose_name_plural = 'Изменения состава рецептов'
+        ordering = ('version',)
+
+    def __str__(self):
+        return f'{self.version}: {self.recipe_id}'
@@ -0,0 +1,82 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from .versions import get_version
+
+COUNT_KEY = 'count:{}:{}:{}'
+ESTIMATE_THRESHOLD = 10000
+COUNT_VERSIONS = {
+    'recipes.recipe': 'recipes',
+    'users.user': 'users',
+}
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с кэшированием количества объектов.
+
+    Количество считается без аннотаций выборки и кэшируется по SQL
+    запроса на PAGINATION_COUNT_CACHE_TIMEOUT секунд. В ключ входит версия
+    данных модели, поэтому запись сбрасывает кэш. Для выборок без
+    условий на PostgreSQL можно использовать оценку планировщика
+    (PAGINATION_COUNT_ESTIMATE).
+    """
+
+    @property
+    def use_estimate(self):
+        return settings.PAGINATION_COUNT_ESTIMATE
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        queryset = self.object_list.values('pk')
+        estimate = self.estimate_count(queryset)
+        if estimate is not None:
+            return estimate
+        timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+        if not timeout:
+            return queryset.count()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        label = queryset.model._meta.label_lower
+        key = COUNT_KEY.format(
+            label,
+            get_version(COUNT_VERSIONS.get(label, label)),
+            md5(f'{sql}{params}'.encode()).hexdigest(),
+        )
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, timeout)
+        return count
+
+    def estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if (not self.use_estimate
+                or connection.vendor != 'postgresql'
+                or queryset.query.where):
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                (queryset.model._meta.db_table,),
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < ESTIMATE_THRESHOLD:
+            return None
+        return int(row[0])
+
+
+class AdminPaginator(CachedCountPaginator):
+    """Paginator админки: для больших таблиц без фильтров на PostgreSQL
+    всегда берется оценка планировщика."""
+    use_estimate = True
@@ -0,0 +1,155 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from users.models import User
+from .images import schedule_delete_variants, schedule_variants
+from .memberships import MEMBERSHIPS
+from .models import (AmountIngredientRecipe, Favorite, Ingredient, Recipe,
+                     ShoppingCart, Tag)
+from .versions import bump_version, log_ingredients_change
+
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    """Сбрасывает закэшированные данные ингредиентов."""
+    bump_version('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    """Сбрасывает закэшированные данные тегов."""
+    bump_version('tags')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Tag)
+def recipes_changed(**kwargs):
+    """Сбрасывает закэшированные данные рецептов.
+
+    Избранное и корзина версию не меняют: фильтры по ним подставляют
+    в запрос id рецептов пользователя, поэтому ключ закэшированного
+    количества меняется вместе с ними.
+    """
+    bump_version('recipes')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=AmountIngredientRecipe)
+def recipe_pages_changed(**kwargs):
+    """Сбрасывает кэш страниц рецептов для анонимных пользователей."""
+    bump_version('recipe_pages')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(action, **kwargs):
+    """Сбрасывает кэши рецептов после изменения их тегов."""
+    if action.startswith('post_'):
+        bump_version('recipes')
+        bump_version('recipe_pages')
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_ingredients_deleted(instance, **kwargs):
+    """Записывает удаление рецепта для индекса ингредиентов.
+
+    Строки состава пишутся в журнал не по одной, а одной записью на
+    рецепт: здесь, в сериализаторе рецепта и в админке.
+    """
+    log_ingredients_change(instance.pk)
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(**kwargs):
+    """Удаление ингредиента меняет состав многих рецептов сразу."""
+    log_ingredients_change()
+
+
+def delete_unused_variants(name):
+    """Удаляет варианты изображения, если оно больше не нужно рецептам."""
+    if name and not Recipe.objects.filter(image=name).exists():
+        transaction.on_commit(lambda: schedule_delete_variants(name))
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_saving(instance, update_fields, **kwargs):
+    """Запоминает прежнее изображение рецепта."""
+    instance._previous_image = None
+    if instance.pk is None or (
+            update_fields is not None and 'image' not in update_fields):
+        return
+    instance._previous_image = Recipe.objects.filter(
+        pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    """Создает варианты изображения рецепта после сохранения и удаляет
+    варианты замененного изображения."""
+    name = instance.image.name
+    transaction.on_commit(lambda: schedule_variants(name))
+    previous = getattr(instance, '_previous_image', None)
+    if previous != name:
+        delete_unused_variants(previous)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    """Удаляет варианты изображения удаленного рецепта."""
+    delete_unused_variants(instance.image.name)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def membership_changed(sender, instance, **kwargs):
+    """Сбрасывает кэш избранного или списка покупок пользователя."""
+    MEMBERSHIPS[sender].invalidate(instance.user_id)
+
+
+def change_counter(queryset, field, delta):
+    """Атомарно меняет счетчик, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    queryset.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_marked(sender, instance, created, **kwargs):
+    """Увеличивает счетчик избранного или списка покупок рецепта."""
+    if created:
+        change_counter(
+            Recipe.objects.filter(pk=instance.recipe_id), COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_unmarked(sender, instance, **kwargs):
+    """Уменьшает счетчик избранного или списка покупок рецепта."""
+    change_counter(
+        Recipe.objects.filter(pk=instance.recipe_id), COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(instance, created, **kwargs):
+    """Увеличивает счетчик рецептов автора."""
+    if created and instance.author_id:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed(instance, **kwargs):
+    """Уменьшает счетчик рецептов автора."""
+    if instance.author_id:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', -1)
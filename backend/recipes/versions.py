@@ -0,0 +1,93 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import DataVersion, RecipeIngredientsChange
+
+# Сколько последних изменений состава рецептов хранится в журнале.
+# Процесс, отставший сильнее, перестраивает индекс целиком.
+CHANGES_KEPT = 10000
+
+
+def get_versions(*names):
+    """Текущие версии наборов данных одним запросом.
+
+    Версия набора, который еще ни разу не менялся, - 0.
+    """
+    versions = dict(DataVersion.objects.filter(
+        name__in=names).values_list('name', 'version'))
+    return tuple(versions.get(name, 0) for name in names)
+
+
+def get_version(name):
+    """Текущая версия набора данных."""
+    return get_versions(name)[0]
+
+
+def _increment(name):
+    if DataVersion.objects.filter(name=name).update(
+            version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(name=name, version=1)
+    except IntegrityError:
+        DataVersion.objects.filter(name=name).update(
+            version=F('version') + 1)
+
+
+class PendingVersions:
+    """Наборы данных, измененные в текущей транзакции соединения.
+
+    Одна функция on_commit на транзакцию увеличивает каждую версию один
+    раз, сколько бы сигналов ни пришло. Если функцию сняли откатом точки
+    сохранения, следующее изменение ставит ее заново.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.names = set()
+
+    def add(self, name):
+        self.names.add(name)
+        if not any(func is self for _, func in
+                   self.connection.run_on_commit):
+            self.connection.on_commit(self)
+
+    def __call__(self):
+        names, self.names = self.names, set()
+        for name in sorted(names):
+            _increment(name)
+
+
+def bump_version(name):
+    """Увеличивает версию набора данных после изменения.
+
+    Внутри транзакции версия меняется только после ее фиксации, чтобы
+    кэши не пересобрались по еще не сохраненным данным.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _increment(name)
+        return
+    pending = getattr(connection, 'pending_versions', None)
+    if pending is None:
+        pending = connection.pending_versions = PendingVersions(connection)
+    pending.add(name)
+
+
+@transaction.atomic
+def log_ingredients_change(recipe_id=None):
+    """Записывает в журнал изменение состава рецепта recipe_id
+    (None - всех рецептов).
+
+    Номер берется из версии recipe_ingredients в текущей транзакции:
+    строка версии заблокирована до ее фиксации, поэтому номера не
+    пропускаются и идут в порядке фиксации.
+    """
+    _increment('recipe_ingredients')
+    version = get_version('recipe_ingredients')
+    RecipeIngredientsChange.objects.create(
+        version=version, recipe_id=recipe_id)
+    if version % CHANGES_KEPT == 0:
+        RecipeIngredientsChange.objects.filter(
+            version__lte=version - CHANGES_KEPT).delete()
@@ -2,6 +2,7 @@ from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as UA
 
+from recipes.paginator import AdminPaginator
 from .models import Subscription, User
 
 
@@ -10,14 +11,21 @@ class UserAdmin(UA):
     """Отображение в админ зоне пользователя."""
     list_display = ('username', 'email', 'first_name', 'last_name')
     search_fields = ('email', 'username', 'first_name', 'last_name')
-    list_filter = ('email', 'first_name',)
+    list_filter = ('is_staff', 'is_active')
     empty_value_display = settings.EMPTY_VALUE
+    paginator = AdminPaginator
+    show_full_result_count = False
 
 
 @admin.register(Subscription)
 class SubscribeAdmin(admin.ModelAdmin):
     """Отображение в админ зоне подписчиков."""
     list_display = ('user', 'author')
-    search_fields = ('user', 'author')
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = (
+        'user__username', 'user__email', 'author__username', 'author__email'
+    )
+    autocomplete_fields = ('user', 'author')
     empty_value_display = settings.EMPTY_VALUE
+    paginator = AdminPaginator
+    show_full_result_count = False
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 04:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_recipes_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['author', 'user'], name='subscription_author_user_idx'),
+        ),
+        migrations.AlterField(
+            model_name='subscription',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+    ]
@@ -5,6 +5,9 @@ from django.db import models
 class User(AbstractUser):
     """Модель пользователя."""
     email = models.EmailField('Email', max_length=254, unique=True)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -32,6 +35,7 @@ class Subscription(models.Model):
         verbose_name='Автор',
         on_delete=models.CASCADE,
         related_name='following',
+        db_index=False,
     )
 
     class Meta:
@@ -43,6 +47,12 @@ class Subscription(models.Model):
                 name='unique_subscribe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='subscription_author_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'Пользователь {self.user} подписан на автора {self.author}.'
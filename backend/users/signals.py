@@ -0,0 +1,69 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.versions import bump_version
+from .models import Subscription, User
+from .tokens import revoke
+
+# Поля пользователя, которые видны в ответах API как данные автора.
+PUBLIC_FIELDS = ('email', 'username', 'first_name', 'last_name')
+
+
+def public_values(user):
+    return tuple(getattr(user, field) for field in PUBLIC_FIELDS)
+
+
+@receiver(post_delete, sender=User)
+@receiver((post_save, post_delete), sender=Subscription)
+def users_changed(**kwargs):
+    """Сбрасывает закэшированные количества пользователей и подписок."""
+    bump_version('users')
+
+
+@receiver(post_delete, sender=User)
+def author_deleted(**kwargs):
+    """Сбрасывает закэшированные ответы с данными авторов."""
+    bump_version('authors')
+
+
+@receiver(pre_save, sender=User)
+def user_saving(instance, update_fields, **kwargs):
+    """Запоминает публичные поля пользователя до сохранения.
+
+    Сохранения только служебных полей (last_login, recipes_count и т.п.)
+    с update_fields лишнего запроса не делают.
+    """
+    instance._public_values = None
+    if instance.pk is None or (
+            update_fields is not None
+            and not set(update_fields) & set(PUBLIC_FIELDS)):
+        return
+    instance._public_values = User.objects.filter(
+        pk=instance.pk).values_list(*PUBLIC_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, created, **kwargs):
+    """Сбрасывает количества при создании пользователя и ответы
+    с данными авторов при смене публичных полей."""
+    if created:
+        bump_version('users')
+        return
+    previous = getattr(instance, '_public_values', None)
+    if previous is not None and previous != public_values(instance):
+        bump_version('authors')
+
+
+@receiver(post_save, sender=User)
+def user_tokens_changed(instance, created, update_fields, **kwargs):
+    """Сбрасывает кэш токенов пользователя: смена пароля, блокировка."""
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    revoke(Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    """Сбрасывает кэш удаленного токена: выход, удаление пользователя."""
+    revoke([instance.key])
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+TOKEN_KEY = 'auth_token:{}'
+# Метка отозванного токена. Пока она лежит в кэше, запрос, который
+# прочитал токен из базы до отзыва, не сможет записать его обратно.
+REVOKED = 'revoked'
+REVOKED_TIMEOUT = 30
+
+
+def get_cached(key):
+    """Пара (пользователь, токен) из кэша или None."""
+    entry = cache.get(TOKEN_KEY.format(key))
+    return None if entry == REVOKED else entry
+
+
+def cache_token(key, user, token):
+    """Кэширует токен, если он не был отозван за время запроса."""
+    cache.add(
+        TOKEN_KEY.format(key), (user, token),
+        settings.AUTH_TOKEN_CACHE_TIMEOUT,
+    )
+
+
+def revoke(keys):
+    """Сбрасывает кэш токенов во всех процессах после фиксации транзакции."""
+    entries = {TOKEN_KEY.format(key): REVOKED for key in keys}
+    if entries:
+        transaction.on_commit(
+            lambda: cache.set_many(entries, REVOKED_TIMEOUT))